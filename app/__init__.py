@@ -1,20 +1,31 @@
 import os
-from flask import Flask, render_template
+import sqlite3
+from flask import Flask, make_response, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
-from config import config
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import config, production_engine_options
+from app.replicas import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
-migrate = Migrate()
 csrf = CSRFProtect()
 
 
-def create_app(config_name=None):
-    """Application factory."""
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked to."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def create_app(config_name=None, overrides=None):
+    """Application factory; ``overrides`` is applied on top of the config class."""
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'development')
     
@@ -25,27 +36,57 @@ def create_app(config_name=None):
     
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(overrides or {})
+    if config_name == 'production':
+        # Pool sized so all workers stay under DB_MAX_CONNECTIONS; refuses too many workers
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', production_engine_options())
     
-    # Initialize extensions with app
+    # Take the client address from the proxy's X-Forwarded-For
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'],
+                                x_proto=app.config['TRUSTED_PROXIES'])
+    
+    # Initialize extensions with app (Flask-Migrate is set up by `flask db`, see app.cli)
     db.init_app(app)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
     csrf.init_app(app)
     
+    # Per-endpoint latency, SQL and template timings
+    from app import metrics
+    metrics.init_app(app)
+    
+    # Slow-query recorder (opt in)
+    from app import slowlog
+    slowlog.init_app(app)
+    
+    # Sampling profiler, switched on from the admin page
+    from app import profiler
+    profiler.init_app(app)
+    
+    # Send read-only requests' SELECTs to replicas, when configured
+    from app import replicas
+    replicas.init_app(app)
+    
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
     # User loader for Flask-Login
-    from app.models import User
+    from app import identity
+    identity.init_app(app)
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return identity.identity_cache().load(int(user_id))
+    
+    # Login/registration throttling
+    from app import ratelimit
+    ratelimit.init_app(app)
     
     # Register blueprints
-    from app.routes import auth, gigs, posts, courses, profile, admin, setup
+    from app.routes import auth, gigs, posts, courses, profile, admin, setup, search
     
     app.register_blueprint(auth.bp)
     app.register_blueprint(gigs.bp)
@@ -54,6 +95,35 @@ def create_app(config_name=None):
     app.register_blueprint(profile.bp)
     app.register_blueprint(admin.bp)
     app.register_blueprint(setup.bp)
+    app.register_blueprint(search.bp)
+    
+    # CLI commands
+    from app import cli
+    cli.init_app(app)
+    
+    # Study-partner matching index
+    from app import matching
+    matching.init_app(app)
+    
+    # Rendered fragment cache
+    from app import cache
+    cache.init_app(app)
+    
+    # Upload storage backend
+    from app import storage
+    storage.init_app(app)
+    
+    # Avatar helpers for templates
+    from app import images
+    images.init_app(app)
+    
+    # Fingerprinted static assets, when built
+    from app import assets
+    assets.init_app(app)
+    
+    # Template/pool warm-up (opt in)
+    from app import warmup
+    warmup.init_app(app)
     
     # Home route
     @app.route('/')
@@ -69,6 +139,13 @@ def create_app(config_name=None):
     def forbidden_error(error):
         return render_template('errors/403.html'), 403
     
+    @app.errorhandler(429)
+    def too_many_requests_error(error):
+        response = make_response(render_template('errors/429.html', retry_after=error.retry_after), 429)
+        if error.retry_after:
+            response.headers['Retry-After'] = str(error.retry_after)
+        return response
+    
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
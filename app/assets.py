@@ -0,0 +1,123 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask assets build`` copies every static file (uploads excluded) to
+``ASSETS_FOLDER`` under a content-hashed name such as
+``css/style.3f2a9c1d08be.css``, writes ``.gz`` (and ``.br`` when the
+optional ``brotli`` or ``brotlicffi`` package is installed) next to
+compressible files, and records the mapping in ``manifest.json``. Templates keep calling
+``url_for('static', filename=...)``; when a manifest is loaded those URLs
+point at the hashed copies, which are served with the best encoding the
+client accepts and cached forever.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # optional, gzip only without it
+        brotli = None
+
+MANIFEST = 'manifest.json'
+SKIP_DIRS = {'uploads'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml', '.ico'}
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+def fingerprint(path, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+
+def build(static_folder, out_folder):
+    """Write hashed and compressed copies of ``static_folder``; return the manifest."""
+    if os.path.isdir(out_folder):
+        shutil.rmtree(out_folder)
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder:
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            source = os.path.join(dirpath, name)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            hashed = fingerprint(rel, data)
+            target = os.path.join(out_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                # mtime=0 keeps the .gz byte-identical across builds
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+            manifest[rel] = hashed
+    with open(os.path.join(out_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(out_folder):
+    try:
+        with open(os.path.join(out_folder, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def asset_url_for(endpoint, **values):
+    """``url_for`` that sends static files to their fingerprinted copy."""
+    if endpoint == 'static':
+        hashed = current_app.extensions['assets_manifest'].get(values.get('filename'))
+        if hashed is not None:
+            values['filename'] = hashed
+            endpoint = 'assets.serve'
+    return url_for(endpoint, **values)
+
+
+@bp.route('/<path:filename>')
+def serve(filename):
+    """Serve a fingerprinted file in the best encoding the client accepts."""
+    folder = current_app.config['ASSETS_FOLDER']
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    served, encoding = filename, None
+    for enc, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[enc] and os.path.isfile(path + suffix):
+            served, encoding = filename + suffix, enc
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(folder, served, mimetype=mimetype, max_age=31536000)
+    if encoding:
+        response.content_encoding = encoding
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    manifest = load_manifest(app.config['ASSETS_FOLDER']) if app.config['ASSETS_ENABLED'] else None
+    if manifest is None:
+        return
+    app.extensions['assets_manifest'] = manifest
+    app.register_blueprint(bp)
+    app.jinja_env.globals['url_for'] = asset_url_for
@@ -0,0 +1,117 @@
+"""Weekly availability as a 168-bit bitmap (one bit per hour, Monday 00:00 first).
+
+Availability is written as semicolon-separated ``<days> <hours>`` entries,
+for example ``Mon-Wed 2pm-5pm; Sat 10-12``. Days may be single names,
+ranges, ``/``-separated lists, ``weekdays``, ``weekends`` or ``daily``;
+hours are 24-hour (``14-17``, ``14:00-17:00``) or 12-hour (``2pm-5pm``)
+ranges. Overlap between two bitmaps is a single integer AND plus a popcount.
+"""
+import re
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+HOURS_PER_DAY = 24
+SLOTS = len(DAYS) * HOURS_PER_DAY
+BITMAP_BYTES = SLOTS // 8
+
+DAY_GROUPS = {
+    'weekdays': DAYS[:5],
+    'weekends': DAYS[5:],
+    'daily': DAYS,
+}
+
+_HOUR = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
+_HOURS_RE = re.compile(r'^' + _HOUR + r'\s*(?:-|to)\s*' + _HOUR + r'$')
+
+
+def _day_index(name):
+    name = name.strip().lower()[:3]
+    if name not in DAYS:
+        raise ValueError(f'Unknown day "{name}".')
+    return DAYS.index(name)
+
+
+def _parse_days(text):
+    text = text.strip().lower()
+    if text in DAY_GROUPS:
+        return [DAYS.index(day) for day in DAY_GROUPS[text]]
+    days = []
+    for part in re.split(r'[/&]', text):
+        if '-' in part:
+            start, end = (_day_index(day) for day in part.split('-', 1))
+            if end < start:
+                end += len(DAYS)
+            days.extend(day % len(DAYS) for day in range(start, end + 1))
+        else:
+            days.append(_day_index(part))
+    return days
+
+
+def _to_hour(hour, minute, meridiem, end=False):
+    hour = int(hour)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f'Invalid hour "{hour}{meridiem}".')
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+    if minute and int(minute) and end:
+        # a range ending at 17:30 still covers the 17:00 slot
+        hour += 1
+    if not 0 <= hour <= HOURS_PER_DAY:
+        raise ValueError(f'Invalid hour "{hour}".')
+    return hour
+
+
+def _parse_hours(text):
+    match = _HOURS_RE.match(text.strip().lower())
+    if not match:
+        raise ValueError(f'Could not read hours "{text.strip()}".')
+    h1, m1, ap1, h2, m2, ap2 = match.groups()
+    end = _to_hour(h2, m2, ap2, end=True)
+    start = _to_hour(h1, m1, ap1)
+    if not ap1 and ap2 and int(h1) <= 12:
+        # "2-5pm" means 2pm-5pm, but "10-12pm" means 10am-12pm
+        shifted = _to_hour(h1, m1, ap2)
+        if shifted < end:
+            start = shifted
+    if end <= start:
+        raise ValueError(f'Hours "{text.strip()}" must end after they start.')
+    return range(start, end)
+
+
+def parse_availability(text):
+    """Parse availability text into a bitmap; raise ValueError if unreadable."""
+    mask = 0
+    for entry in re.split(r'[;,\n]', text):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(None, 1)
+        if len(parts) != 2:
+            raise ValueError(f'"{entry}" needs both days and hours, e.g. "Mon-Wed 14-17".')
+        for day in _parse_days(parts[0]):
+            for hour in _parse_hours(parts[1]):
+                mask |= 1 << (day * HOURS_PER_DAY + hour)
+    if not mask:
+        raise ValueError('Please give at least one day and time range.')
+    return mask
+
+
+def to_bytes(mask):
+    return mask.to_bytes(BITMAP_BYTES, 'little')
+
+
+def from_bytes(data):
+    return int.from_bytes(data, 'little') if data else 0
+
+
+def iter_slots(mask):
+    """Yield the slot numbers (0-167) set in ``mask``."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def overlap_hours(a, b):
+    """Number of weekly hours two bitmaps share."""
+    return (a & b).bit_count()
+
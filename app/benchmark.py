@@ -0,0 +1,239 @@
+"""Endpoint benchmarks through the Flask test client.
+
+Every GET route in the URL map is requested ``iterations`` times after a
+warm-up request, filling URL arguments with sample rows from the database.
+For each route it records latency percentiles and the SQL query count, and
+runs one extra request under ``tracemalloc`` for peak memory (kept out of
+the timed runs because tracing slows allocation down). Results can be saved
+as a JSON baseline and later runs compared against it.
+
+Cold starts are measured separately, in fresh interpreters: per-module
+import cost (``python -X importtime``) and time to the first response.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from flask import current_app, url_for
+from app import db
+from app.models import User, Gig, Post, Course
+from app.queries import count_queries
+
+# Endpoints that change state or aren't pages
+SKIP_ENDPOINTS = {'static', 'assets.serve', 'auth.logout'}
+
+DEFAULT_TOLERANCE = 0.25  # allowed p90 slowdown
+MIN_SLOWDOWN_MS = 2.0  # ignore timer noise on very fast routes
+MEMORY_TOLERANCE = 0.5
+
+
+def sample_arguments(viewer):
+    """Values for URL arguments, taken from existing rows."""
+    post = Post.query.order_by(Post.id.desc()).first()
+    gig = Gig.query.order_by(Gig.id.desc()).first()
+    course = Course.query.order_by(Course.id.desc()).first()
+    return {
+        'post_id': post and post.id,
+        'gig_id': gig and gig.id,
+        'course_id': course and course.id,
+        'user_id': viewer.id if viewer else None,
+        'username': viewer.username if viewer else None,
+        'kind': 'users',
+        'fmt': 'csv',
+    }
+
+
+def routes(app, arguments):
+    """``(endpoint, url)`` for every GET route whose arguments we can fill."""
+    found = []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            if 'GET' not in rule.methods or rule.endpoint in SKIP_ENDPOINTS:
+                continue
+            values = {name: arguments.get(name) for name in rule.arguments}
+            if any(value is None for value in values.values()):
+                continue
+            found.append((rule.endpoint, url_for(rule.endpoint, **values)))
+    return found
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _fetch(client, url):
+    """GET ``url`` and read the whole body, so streamed responses are timed too."""
+    response = client.get(url)
+    response.get_data()
+    response.close()
+    return response.status_code
+
+
+def measure(client, url, iterations):
+    _fetch(client, url)  # warm caches and lazy imports
+    latencies = []
+    queries = 0
+    for _ in range(iterations):
+        with count_queries() as counter:
+            start = time.perf_counter()
+            status = _fetch(client, url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, counter.count)
+
+    tracemalloc.start()
+    _fetch(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p90_ms': round(_percentile(latencies, 0.9), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(iterations=20, viewer_email=None, only=None, echo=None):
+    """Benchmark every route; return ``{endpoint: result}``."""
+    app = current_app._get_current_object()
+    viewer = User.query.filter_by(email=viewer_email).first() if viewer_email else None
+    if viewer_email and viewer is None:
+        raise ValueError(f'No user with email {viewer_email}')
+    arguments = sample_arguments(viewer)
+    db.session.remove()
+
+    client = app.test_client()
+    if viewer is not None:
+        # log in through the session so the run doesn't hit the login throttle
+        with client.session_transaction() as session:
+            session['_user_id'] = str(viewer.id)
+            session['_fresh'] = True
+
+    results = {}
+    for endpoint, url in routes(app, arguments):
+        if only and not any(endpoint.startswith(prefix) for prefix in only):
+            continue
+        results[endpoint] = dict(url=url, **measure(client, url, iterations))
+        if echo:
+            echo(endpoint, results[endpoint])
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions against ``baseline`` as a list of messages.
+
+    Any extra query is a regression; p90 latency may grow by ``tolerance``
+    (or ``MIN_SLOWDOWN_MS``, whichever is more) and peak memory by
+    ``MEMORY_TOLERANCE``.
+    """
+    problems = []
+    for endpoint, result in results.items():
+        base = baseline.get(endpoint)
+        if base is None:
+            continue
+        if result['status'] != base['status']:
+            problems.append(f'{endpoint}: status {base["status"]} -> {result["status"]}')
+        if result['queries'] > base['queries']:
+            problems.append(f'{endpoint}: {base["queries"]} -> {result["queries"]} queries')
+        if result['p90_ms'] > max(base['p90_ms'] * (1 + tolerance), base['p90_ms'] + MIN_SLOWDOWN_MS):
+            problems.append(f'{endpoint}: p90 {base["p90_ms"]:.1f} -> {result["p90_ms"]:.1f} ms')
+        if result['peak_kb'] > base['peak_kb'] * (1 + MEMORY_TOLERANCE):
+            problems.append(f'{endpoint}: peak memory {base["peak_kb"]:.0f} -> {result["peak_kb"]:.0f} KiB')
+    return problems
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+# Runs in a fresh interpreter: create the app the way a gunicorn worker does
+# and time the first and second request
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from run import app
+if app.config['WARMUP_ENABLED']:
+    from app.warmup import prime_pool
+    prime_pool(app)  # gunicorn's post_fork does this
+ready = time.perf_counter()
+client = app.test_client()
+timings = []
+for _ in range(2):
+    before = time.perf_counter()
+    response = client.get(sys.argv[1])
+    response.get_data()
+    response.close()
+    timings.append(time.perf_counter() - before)
+print(json.dumps({'status': response.status_code, 'startup_ms': (ready - start) * 1000,
+                  'first_ms': timings[0] * 1000, 'second_ms': timings[1] * 1000,
+                  'first_response_ms': (ready - start + timings[0]) * 1000}))
+"""
+
+
+def _project_root():
+    return os.path.dirname(current_app.root_path)
+
+
+def time_to_first_response(url='/', runs=5, warmup=False):
+    """Median startup and first/second request times over ``runs`` fresh processes.
+
+    ``process_ms`` is the whole process as seen from outside, interpreter
+    start-up and exit included.
+    """
+    env = dict(os.environ, WARMUP_ENABLED='1' if warmup else '0')
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, url], cwd=_project_root(),
+                                   env=env, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        if completed.returncode:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        samples.append(dict(json.loads(completed.stdout.strip().splitlines()[-1]), process_ms=elapsed))
+    result = {name: round(statistics.median(sample[name] for sample in samples), 1)
+              for name in ('startup_ms', 'first_ms', 'second_ms', 'first_response_ms', 'process_ms')}
+    result['status'] = samples[-1]['status']
+    return result
+
+
+def import_times(module='run'):
+    """``(module, self_us, cumulative_us)`` for everything ``import module`` loads.
+
+    Parsed from ``python -X importtime`` in a fresh interpreter; nested
+    imports are indented in the output and counted in their parent's
+    cumulative time.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=_project_root(), capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def by_package(rows):
+    """Self time summed per top-level package, costliest first."""
+    totals = {}
+    for name, own, _ in rows:
+        package = name.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
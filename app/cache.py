@@ -0,0 +1,128 @@
+"""In-process caches."""
+import threading
+from collections import OrderedDict
+from flask import current_app, render_template
+from markupsafe import Markup
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize=1024, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False)[0])
+                self.evictions += 1
+        if self.on_evict:
+            for old in evicted:
+                self.on_evict(old)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class FragmentCache:
+    """Rendered template fragments, invalidated by tag.
+
+    Keys include everything the fragment shows that can change, so a stale
+    entry is never served even if an invalidation is missed (e.g. one made
+    by another worker); tags let writers free the memory straight away.
+    """
+
+    def __init__(self, maxsize=2048):
+        self.entries = LRUCache(maxsize, on_evict=self._forget)
+        self._tags = {}
+        self._key_tags = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, key):
+        with self._lock:
+            for tag in self._key_tags.pop(key, ()):
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+    def get_or_render(self, key, render, tags=()):
+        html = self.entries.get(key)
+        if html is None:
+            html = Markup(render())
+            self.entries.set(key, html)
+            with self._lock:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+        return html
+
+    def invalidate(self, tag):
+        """Drop every fragment carrying ``tag``."""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+        for key in keys:
+            self.entries.delete(key)
+            self._forget(key)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+def fragment_cache():
+    return current_app.extensions['fragment_cache']
+
+
+def cached_post_fragment(template, post):
+    """Render ``template`` for ``post`` through the fragment cache."""
+    key = (template, post.id, post.updated_at, post.author.username)
+    return fragment_cache().get_or_render(
+        key,
+        lambda: render_template(template, post=post),
+        tags=(f'post:{post.id}', f'user:{post.user_id}'),
+    )
+
+
+def init_app(app):
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+    app.jinja_env.globals['cached_post_fragment'] = cached_post_fragment
@@ -0,0 +1,257 @@
+import time
+import click
+from flask.cli import AppGroup, ScriptInfo
+
+
+class MigrateGroup(click.Group):
+    """``flask db``, importing Flask-Migrate (and Alembic) only when it is run.
+
+    Alembic is the single largest import of the app and web workers never
+    need it, so the real command group is set up on first use.
+    """
+
+    def _group(self, ctx):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_group
+        from app import db
+        app = ctx.ensure_object(ScriptInfo).load_app()
+        if 'migrate' not in app.extensions:
+            Migrate(app, db)
+        return db_group
+
+    def list_commands(self, ctx):
+        return self._group(ctx).list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group(ctx).get_command(ctx, name)
+
+
+search_cli = AppGroup('search', help='Manage the full-text search index.')
+
+
+@search_cli.command('rebuild')
+def rebuild_search_index():
+    """Recreate the search index and reindex all content."""
+    from app.search import rebuild_index
+    count = rebuild_index()
+    click.echo(f'Indexed {count} documents.')
+
+
+stats_cli = AppGroup('stats', help='Dashboard statistics.')
+
+
+@stats_cli.command('reconcile')
+def reconcile_stats():
+    """Recompute dashboard counters and daily buckets from scratch."""
+    from app.stats import reconcile
+    totals = reconcile()
+    click.echo(', '.join(f'{name}: {count}' for name, count in totals.items()))
+
+
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+
+
+@assets_cli.command('build')
+def build_assets():
+    """Fingerprint and precompress static files into ASSETS_FOLDER."""
+    from flask import current_app
+    from app.assets import brotli, build
+    manifest = build(current_app.static_folder, current_app.config['ASSETS_FOLDER'])
+    encodings = 'gzip, brotli' if brotli is not None else 'gzip'
+    click.echo(f'Built {len(manifest)} assets ({encodings}).')
+
+
+passwords_cli = AppGroup('passwords', help='Password hashing.')
+
+
+@passwords_cli.command('calibrate')
+@click.option('--algorithm', type=click.Choice(['scrypt', 'pbkdf2']), default='scrypt')
+@click.option('--target-ms', default=250, show_default=True, help='Time budget for one hash.')
+@click.option('--max-memory-mb', default=64, show_default=True, help='scrypt memory ceiling per hash.')
+def calibrate_passwords(algorithm, target_ms, max_memory_mb):
+    """Benchmark hashing on this machine and suggest PASSWORD_HASH_METHOD."""
+    from flask import current_app
+    from app.passwords import calibrate, normalize_method
+    current = normalize_method(current_app.config['PASSWORD_HASH_METHOD'])
+    try:
+        method, seconds = calibrate(algorithm, target_ms / 1000, max_memory_mb * 2 ** 20)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Current: {current}')
+    click.echo(f'Suggested: PASSWORD_HASH_METHOD={method} ({seconds * 1000:.0f} ms per hash)')
+    if method != current:
+        click.echo('Existing hashes are upgraded as their owners log in.')
+
+
+users_cli = AppGroup('users', help='User accounts.')
+
+
+@users_cli.command('import')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--on-conflict', type=click.Choice(['skip', 'upsert']), default='skip', show_default=True,
+              help='What to do with rows whose email is already registered.')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--workers', type=int, default=None, help='Hashing processes (default: CPU count).')
+@click.option('--passwords-out', type=click.File('w'),
+              help='Generate passwords for rows without one and write them here as CSV.')
+def import_users_command(csv_file, on_conflict, batch_size, workers, passwords_out):
+    """Create accounts in bulk from a CSV (username,email,role,major,bio,password)."""
+    import csv
+    from app.user_import import import_users
+    on_generated = None
+    if passwords_out is not None:
+        writer = csv.writer(passwords_out)
+        writer.writerow(['email', 'password'])
+        on_generated = lambda email, password: writer.writerow([email, password])
+    
+    def progress(result):
+        click.echo(f'{result.rows} rows: {result.created} created, '
+                   f'{result.updated} updated, {len(result.skipped)} skipped')
+    
+    try:
+        result = import_users(csv_file, upsert=on_conflict == 'upsert', batch_size=batch_size,
+                              workers=workers, on_generated=on_generated, on_batch=progress)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for line, reason in result.skipped:
+        click.echo(f'line {line}: skipped, {reason}', err=True)
+    progress(result)
+
+
+bench_cli = AppGroup('bench', help='Synthetic data and endpoint benchmarks.')
+
+
+@bench_cli.command('seed')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--posts', default=10000, show_default=True)
+@click.option('--gigs', default=2000, show_default=True)
+@click.option('--courses', default=500, show_default=True)
+@click.option('--days', default=365, show_default=True, help='Spread creation dates over this many days.')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed.')
+def seed_command(users, posts, gigs, courses, days, seed_value):
+    """Bulk-insert a reproducible synthetic dataset."""
+    from app.seed import PASSWORD, USERNAME_PREFIX, already_seeded, seed
+    if already_seeded():
+        raise click.ClickException(f'Database already has {USERNAME_PREFIX}* users.')
+    start = time.perf_counter()
+    counts = seed(users=max(users, 1), posts=posts, gigs=gigs, courses=courses, seed=seed_value,
+                  days=days, echo=click.echo)
+    click.echo(f'Seeded {counts} in {time.perf_counter() - start:.1f}s. '
+               f'Log in as {USERNAME_PREFIX}admin@example.com / {PASSWORD}.')
+
+
+@bench_cli.command('run')
+@click.option('--iterations', default=20, show_default=True, type=click.IntRange(min=1))
+@click.option('--as', 'viewer', default='seed_admin@example.com', show_default=True,
+              help='Email of the user to browse as; empty for anonymous.')
+@click.option('--only', multiple=True, help='Endpoint prefix to include, e.g. posts. or admin.dashboard.')
+@click.option('--baseline', type=click.Path(dir_okay=False), default='benchmarks/baseline.json',
+              show_default=True)
+@click.option('--save', is_flag=True, help='Write the results as the new baseline.')
+@click.option('--tolerance', default=0.25, show_default=True, help='Allowed p90 slowdown vs. baseline.')
+def bench_run(iterations, viewer, only, baseline, save, tolerance):
+    """Benchmark every GET route; fail on regressions against the baseline."""
+    import os
+    from app import benchmark
+    
+    def row(endpoint, r):
+        click.echo(f'{endpoint:<28} {r["status"]:>3} {r["p50_ms"]:>8.2f} {r["p90_ms"]:>8.2f} '
+                   f'{r["p99_ms"]:>8.2f} {r["queries"]:>4} {r["peak_kb"]:>9.1f}')
+    
+    click.echo(f'{"endpoint":<28} {"st":>3} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"sql":>4} {"peak KiB":>9}')
+    try:
+        results = benchmark.run(iterations, viewer or None, only, echo=row)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    if save:
+        os.makedirs(os.path.dirname(baseline) or '.', exist_ok=True)
+        benchmark.save_baseline(results, baseline)
+        click.echo(f'Saved baseline to {baseline}.')
+    elif os.path.exists(baseline):
+        problems = benchmark.compare(results, benchmark.load_baseline(baseline), tolerance)
+        for problem in problems:
+            click.echo(f'REGRESSION {problem}', err=True)
+        if problems:
+            raise SystemExit(1)
+        click.echo(f'No regressions against {baseline}.')
+
+
+@bench_cli.command('imports')
+@click.option('--top', default=25, show_default=True)
+@click.option('--sort', type=click.Choice(['self', 'cumulative']), default='cumulative', show_default=True)
+@click.option('--packages', is_flag=True, help='Sum self time per top-level package instead.')
+@click.option('--module', default='run', show_default=True, help='Module to import.')
+def bench_imports(top, sort, packages, module):
+    """Per-module import cost of starting the app in a fresh interpreter."""
+    from app import benchmark
+    try:
+        rows = benchmark.import_times(module)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    total = sum(own for _, own, _ in rows)
+    if packages:
+        click.echo(f'{"package":<40} {"self ms":>9}')
+        for package, own in benchmark.by_package(rows)[:top]:
+            click.echo(f'{package:<40} {own / 1000:>9.1f}')
+    else:
+        column = 1 if sort == 'self' else 2
+        click.echo(f'{"module":<60} {"self ms":>9} {"cum ms":>9}')
+        for name, own, cumulative in sorted(rows, key=lambda r: r[column], reverse=True)[:top]:
+            click.echo(f'{name:<60} {own / 1000:>9.1f} {cumulative / 1000:>9.1f}')
+    click.echo(f'{len(rows)} modules, {total / 1000:.0f} ms in total.')
+
+
+@bench_cli.command('startup')
+@click.option('--runs', default=5, show_default=True, type=click.IntRange(min=1))
+@click.option('--url', default='/posts/', show_default=True)
+def bench_startup(runs, url):
+    """Time to first response of a fresh process, with and without warm-up."""
+    from app import benchmark
+    click.echo(f'{"warm-up":<8} {"startup":>9} {"1st req":>9} {"2nd req":>9} {"to 1st":>9} {"process":>9}  (median ms)')
+    for warmup in (False, True):
+        try:
+            r = benchmark.time_to_first_response(url, runs, warmup)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'{"on" if warmup else "off":<8} {r["startup_ms"]:>9.1f} {r["first_ms"]:>9.1f} '
+                   f'{r["second_ms"]:>9.1f} {r["first_response_ms"]:>9.1f} {r["process_ms"]:>9.1f}')
+
+
+slowlog_cli = AppGroup('slowlog', help='Slow-query log.')
+
+
+@slowlog_cli.command('dump')
+@click.option('--limit', default=50, show_default=True)
+@click.option('--json', 'as_json', is_flag=True, help='Print raw JSON lines.')
+def dump_slowlog(limit, as_json):
+    """Print the newest entries of SLOW_QUERY_LOG_FILE."""
+    import json
+    from flask import current_app
+    from app.slowlog import read_file
+    path = current_app.config['SLOW_QUERY_LOG_FILE']
+    if not path:
+        raise click.ClickException('Set SLOW_QUERY_LOG_FILE to collect slow queries from the app.')
+    for entry in read_file(path, limit):
+        if as_json:
+            click.echo(json.dumps(entry))
+            continue
+        click.echo(f'{entry["at"]}  {entry["duration_ms"]:.1f} ms  {entry["endpoint"] or "-"}  '
+                   f'{entry.get("bind") or "primary"}')
+        click.echo(f'  {entry["statement"]}')
+        if entry['parameters']:
+            click.echo(f'  params: {entry["parameters"]}')
+        for line in entry['plan'] or ():
+            click.echo(f'    {line}')
+
+
+def init_app(app):
+    """Register the application's CLI command groups."""
+    app.cli.add_command(search_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(passwords_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(slowlog_cli)
+    app.cli.add_command(MigrateGroup('db', help='Perform database migrations.'))
@@ -0,0 +1,81 @@
+"""Conditional GET support for read-only pages.
+
+Views compute a cheap validator from the timestamps of the rows they show
+and call ``render_conditional`` instead of ``render_template``; if the
+client's cached copy is still current it gets a bodyless 304 and the
+template is never rendered.
+"""
+import hashlib
+import time
+from datetime import timezone
+from flask import current_app, make_response, render_template, request, session
+from flask_login import current_user
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def viewer_variant():
+    """The part of a page's validator that depends on who is looking.
+
+    Logged-in pages show the username, edit/delete controls and CSRF tokens.
+    Tokens are tied to the session's CSRF secret and expire after
+    ``WTF_CSRF_TIME_LIMIT``, so the validator also rolls over every half
+    time limit to keep a 304 from reviving a page whose tokens are expired.
+    """
+    if not current_user.is_authenticated:
+        return ('anonymous',)
+    secret = hashlib.sha1(str(session.get('csrf_token', '')).encode()).hexdigest()
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    window = int(time.time() // max(limit // 2, 1)) if limit else 0
+    return ('user', current_user.id, current_user.username, current_user.role, secret, window)
+
+
+def listing_validators(items, owner_attr):
+    """Validator parts and Last-Modified time for a page of content rows."""
+    parts = [(item.id, item.updated_at or item.created_at, getattr(item, owner_attr).username)
+             for item in items]
+    timestamps = [item.updated_at or item.created_at for item in items]
+    return parts, max(timestamps, default=None)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def render_conditional(template, validators, last_modified=None, **context):
+    """Render ``template`` unless the client already has this exact page.
+
+    ``validators`` must capture everything the page shows that can change;
+    ``last_modified`` is a naive UTC datetime. Pages carrying flashed
+    messages are one-off and always rendered.
+    """
+    if '_flashes' in session:
+        return render_template(template, **context)
+
+    anonymous = not current_user.is_authenticated
+    etag = make_etag(request.full_path, validators, viewer_variant())
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    # Last-Modified can't tell viewers apart, so only anonymous pages use it
+    if _not_modified(etag, last_modified if anonymous else None):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render_template(template, **context))
+
+    response.set_etag(etag)
+    if anonymous and last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if anonymous:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
@@ -1,6 +1,8 @@
 from functools import wraps
-from flask import abort
+from flask import abort, current_app, request
 from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+from app.ratelimit import get_limiter, parse_limit
 
 
 def login_required_with_role(*roles):
@@ -37,3 +39,47 @@ def teacher_or_admin_required(f):
             abort(403)
         return f(*args, **kwargs)
     return decorated_function
+
+
+def client_ip():
+    """Rate-limit key for the requesting address."""
+    return request.remote_addr or 'unknown'
+
+
+def form_field(name):
+    """Rate-limit key from a submitted form field, e.g. the login email."""
+    def key():
+        value = request.form.get(name, '').strip().lower()
+        return value or None
+    key.__name__ = f'form_{name}'
+    return key
+
+
+def rate_limit(limit, key=client_ip, methods=('POST',), scope=None):
+    """Decorator to reject requests over ``limit`` (e.g. '5/minute') per ``key``.
+
+    ``limit`` may also name a config key holding the policy. Checked before
+    the view runs, so rejected requests cost no hashing. Stack it to
+    combine limits, e.g. per IP and per account.
+    """
+    configured = '/' not in limit
+    if not configured:
+        parse_limit(limit)
+    
+    def decorator(f):
+        name = scope or f'{f.__module__}.{f.__name__}'
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method in methods and current_app.config['RATELIMIT_ENABLED']:
+                policy = current_app.config[limit] if configured else limit
+                value = key()
+                if value is not None:
+                    count, period = parse_limit(policy)
+                    retry_after = get_limiter().hit(f'{name}:{key.__name__}:{value}:{policy}',
+                                                    count, period)
+                    if retry_after is not None:
+                        raise TooManyRequests(retry_after=retry_after)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,36 @@
+"""Summary fields stored alongside a post's body.
+
+Listings show an excerpt, a word count and a reading time for each post.
+They are computed once when the body is written, so listing queries can
+leave the full ``content`` column unloaded.
+"""
+import math
+import re
+
+EXCERPT_LENGTH = 200
+ELLIPSIS = '...'
+WORDS_PER_MINUTE = 200
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """The first ``length`` characters of ``text``, with an ellipsis if cut."""
+    if len(text) > length:
+        return text[:length] + ELLIPSIS
+    return text
+
+
+def word_count(text):
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+def reading_time(words):
+    """Minutes to read ``words`` words, rounded up; at least one."""
+    return max(1, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def summarize(text):
+    """``{'excerpt', 'word_count', 'reading_time'}`` for a post body."""
+    words = word_count(text)
+    return {'excerpt': excerpt(text), 'word_count': words, 'reading_time': reading_time(words)}
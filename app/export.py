@@ -0,0 +1,44 @@
+"""Streaming CSV / NDJSON export of query results."""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialise {type(value).__name__}')
+
+
+def stream_rows(rows, columns, fmt, batch_size=500):
+    """Yield ``rows`` (tuples in ``columns`` order) as encoded chunks.
+
+    ``rows`` should be a server-side cursor (``yield_per``) so memory stays
+    flat however large the export; output is flushed every ``batch_size``
+    rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    for i, row in enumerate(rows, 1):
+        if writer:
+            writer.writerow(['' if v is None else v.isoformat() if isinstance(v, datetime) else v
+                             for v in row])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+            buffer.write('\n')
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
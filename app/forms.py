@@ -3,6 +3,7 @@ from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, URL, Optional
 from app.models import User
+from app.availability import parse_availability
 
 
 class LoginForm(FlaskForm):
@@ -57,6 +58,13 @@ class GigForm(FlaskForm):
         Length(max=255, message='Please keep availability description under 255 characters.')
     ])
     submit = SubmitField('Post Gig')
+    
+    def validate_available_hours(self, available_hours):
+        """Check availability is in the structured day/hour format."""
+        try:
+            parse_availability(available_hours.data)
+        except ValueError as e:
+            raise ValidationError(str(e))
 
 
 class PostForm(FlaskForm):
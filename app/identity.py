@@ -0,0 +1,166 @@
+"""Cached identity for Flask-Login's user loader.
+
+Every authenticated request used to load its user row. The loader now
+keeps a snapshot of the row's columns in a bounded per-worker LRU with a
+TTL and rebuilds the ``User`` from it without a query. Commits that change
+or delete a user invalidate that user's entry.
+
+Invalidations made in one gunicorn worker only reach the others through
+the TTL. With ``REDIS_URL`` set, every user also gets a shared version stamp
+that is bumped on invalidation and checked on each load (one round trip,
+which also carries a shared copy of the snapshot), so changes apply
+everywhere at once.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import DateTime, event, inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.cache import LRUCache
+from app.models import User
+from app.replicas import on_primary
+
+# Only needed to check a password; loaded on access when it is
+EXCLUDED = {'password_hash'}
+FIELDS = [attr.key for attr in sa_inspect(User).column_attrs if attr.key not in EXCLUDED]
+DATETIME_FIELDS = {attr.key for attr in sa_inspect(User).column_attrs
+                   if isinstance(attr.columns[0].type, DateTime)}
+
+
+def snapshot(user):
+    return {key: getattr(user, key) for key in FIELDS}
+
+
+def restore(data):
+    """Attach a ``User`` built from ``data`` to the session without a query."""
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+class RedisIdentityStore:
+    """Version stamps and snapshots shared by every worker."""
+
+    prefix = 'unishare:user:'
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('REDIS_URL requires the redis package (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def fetch(self, user_id):
+        """Return ``(version, snapshot or None)``."""
+        version, blob = self.client.mget(f'{self.prefix}{user_id}:version',
+                                         f'{self.prefix}{user_id}:data')
+        version = int(version or 0)
+        if blob is None:
+            return version, None
+        stored = json.loads(blob)
+        if stored['version'] != version:
+            return version, None
+        data = stored['data']
+        for key in DATETIME_FIELDS:
+            if data.get(key):
+                data[key] = datetime.fromisoformat(data[key])
+        return version, data
+
+    def store(self, user_id, version, data):
+        blob = json.dumps({'version': version, 'data': data},
+                          default=lambda v: v.isoformat())
+        self.client.set(f'{self.prefix}{user_id}:data', blob, ex=self.ttl)
+
+    def bump(self, user_id):
+        with self.client.pipeline() as pipe:
+            pipe.incr(f'{self.prefix}{user_id}:version')
+            pipe.delete(f'{self.prefix}{user_id}:data')
+            pipe.execute()
+
+
+class IdentityCache:
+    """TTL-bounded user snapshots keyed by id and version stamp."""
+
+    def __init__(self, maxsize=4096, ttl=30, shared=None):
+        self.entries = LRUCache(maxsize)
+        self.ttl = ttl
+        self.shared = shared
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        version, data = self.shared.fetch(user_id) if self.shared else (0, None)
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            entry_version, expires, cached = entry
+            if entry_version == version and expires > time.monotonic():
+                return restore(cached)
+
+        generation = self._generation
+        if data is None:
+            with on_primary():
+                user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            data = snapshot(user)
+            if self.shared:
+                self.shared.store(user_id, version, data)
+        else:
+            user = restore(data)
+
+        # Don't keep a row read while an invalidation was happening
+        with self._lock:
+            if generation == self._generation:
+                self.entries.set(user_id, (version, time.monotonic() + self.ttl, data))
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self.entries.delete(user_id)
+        if self.shared:
+            self.shared.bump(user_id)
+
+    def stats(self):
+        return self.entries.stats()
+
+
+def identity_cache():
+    return current_app.extensions['identity_cache']
+
+
+def invalidate_user(user_id):
+    """Forget ``user_id`` after a change made outside the ORM session."""
+    if has_app_context() and 'identity_cache' in current_app.extensions:
+        identity_cache().invalidate(user_id)
+
+
+def init_app(app):
+    shared = None
+    if app.config['REDIS_URL']:
+        shared = RedisIdentityStore(app.config['REDIS_URL'], app.config['USER_CACHE_TTL'])
+    app.extensions['identity_cache'] = IdentityCache(app.config['USER_CACHE_SIZE'],
+                                                     app.config['USER_CACHE_TTL'], shared)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault('identity_changed_users', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('identity_changed_users', ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('identity_changed_users', None)
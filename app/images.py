@@ -0,0 +1,174 @@
+"""Profile picture processing.
+
+Uploads are kept in content-addressed storage as ``<sha256>.orig`` and
+handed to a small thread pool that produces square WebP and JPEG variants
+for each size in ``AVATAR_SIZES``. Until the variants exist the user's
+``avatar_ready`` flag stays False and templates show the initial-letter
+placeholder. A picture someone has already uploaded is ready at once.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for
+from app import db, storage
+
+AVATAR_SIZES = {
+    'sm': 40,
+    'md': 120,
+    'lg': 300,
+}
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    """Per-process pool, created lazily so forked workers don't share threads."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=app.config['AVATAR_WORKERS'],
+                                           thread_name_prefix='avatar')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def variant_name(base, size, ext):
+    return f'{base}-{size}.{ext}'
+
+
+def avatar_keys(digest):
+    """Every storage key belonging to a content-addressed picture."""
+    return [digest + '.orig'] + [variant_name(digest, name, ext)
+                                 for name in AVATAR_SIZES for ext in FORMATS]
+
+
+def is_legacy(picture):
+    """Pictures saved before variants existed are single resized files."""
+    return '.' in picture
+
+
+def accept_avatar(upload):
+    """Store an upload and return ``(digest, ready)``.
+
+    Adds a reference in the current transaction. ``ready`` is True when the
+    same image was uploaded before and its variants already exist.
+    """
+    digest, created = storage.store_upload(upload, suffix='.orig')
+    ready = not created and storage.get_backend().exists(variant_name(digest, 'lg', 'jpg'))
+    return digest, ready
+
+
+def schedule_avatar(user_id, digest):
+    """Render variants for ``digest`` in the background (inline when configured)."""
+    app = current_app._get_current_object()
+    if app.config['AVATAR_PROCESS_INLINE']:
+        process_avatar(app, user_id, digest)
+    else:
+        _get_executor(app).submit(process_avatar, app, user_id, digest)
+
+
+def render_variants(source, digest):
+    """Yield ``(key, content_type, data)`` for every size/format variant."""
+    # Pillow is only needed here, in the avatar pool; keep it off the startup path
+    from PIL import Image, ImageOps
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        for name, px in AVATAR_SIZES.items():
+            square = ImageOps.fit(img, (px, px), Image.LANCZOS)
+            for ext, (fmt, content_type, options) in FORMATS.items():
+                data = io.BytesIO()
+                square.save(data, fmt, **options)
+                data.seek(0)
+                yield variant_name(digest, name, ext), content_type, data
+
+
+def process_avatar(app, user_id, digest):
+    """Background job: render variants, then flag the user's avatar ready."""
+    from app.identity import invalidate_user
+    from app.models import User
+
+    with app.app_context():
+        backend = storage.get_backend()
+        try:
+            with backend.open(digest + '.orig') as source:
+                for key, content_type, data in render_variants(source, digest):
+                    backend.put(key, data, content_type)
+            ready = True
+        except Exception:
+            app.logger.exception('Processing avatar %s for user %s failed', digest, user_id)
+            ready = False
+
+        # Only touch the row if the user hasn't uploaded another picture since
+        changed = User.query.filter_by(id=user_id, profile_picture=digest).update(
+            {'avatar_ready': True} if ready else {'profile_picture': None},
+            synchronize_session=False)
+        db.session.commit()
+        if changed:
+            invalidate_user(user_id)
+        if changed and not ready:
+            storage.release(digest, avatar_keys(digest))
+        db.session.remove()
+
+
+def delete_avatar(picture):
+    """Drop a reference to ``picture``; its files go once nobody uses them.
+
+    Commits, so call it after the change that replaced or removed the picture.
+    """
+    if is_legacy(picture):
+        storage.get_backend().delete(picture)
+    else:
+        storage.release(picture, avatar_keys(picture))
+
+
+def _release_avatar(app, picture):
+    with app.app_context():
+        try:
+            delete_avatar(picture)
+        except Exception:
+            app.logger.exception('Releasing avatar %s failed', picture)
+        finally:
+            db.session.remove()
+
+
+def schedule_avatar_release(picture):
+    """Release ``picture`` in the avatar pool instead of while the request waits."""
+    app = current_app._get_current_object()
+    if app.config['AVATAR_PROCESS_INLINE']:
+        delete_avatar(picture)
+    else:
+        _get_executor(app).submit(_release_avatar, app, picture)
+
+
+def avatar_sources(user):
+    """URLs for ``<picture>``, or None while there is nothing to show."""
+    picture = user.profile_picture
+    if not picture:
+        return None
+    if is_legacy(picture):
+        url = url_for('static', filename='uploads/' + picture)
+        return {'src': url, 'webp': None, 'jpg': url}
+    if not user.avatar_ready:
+        return None
+    backend = storage.get_backend()
+
+    def srcset(ext):
+        return ', '.join('{} {}w'.format(backend.url(variant_name(picture, name, ext)), px)
+                         for name, px in AVATAR_SIZES.items())
+
+    return {
+        'src': backend.url(variant_name(picture, 'lg', 'jpg')),
+        'webp': srcset('webp'),
+        'jpg': srcset('jpg'),
+    }
+
+
+def init_app(app):
+    app.jinja_env.globals['avatar_sources'] = avatar_sources
@@ -0,0 +1,215 @@
+"""Study-partner matching.
+
+Each student is described by a sparse, L2-normalised feature vector built
+from their major, the majors and subjects of their gigs and the titles of
+their posts. Vectors live in an in-process inverted index (feature -> user
+weights), so a top-k query only touches users who share at least one
+feature with the asking student instead of scanning everyone.
+
+Commits that touch a user's gigs, posts or major mark that user stale;
+stale vectors are recomputed in one batch on the next query. Each worker
+process keeps its own index and also rebuilds it every ``MATCH_INDEX_TTL``
+seconds to pick up changes committed by other workers.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app import db
+from app.availability import from_bytes, overlap_hours
+from app.models import User, Gig, Post
+from app.replicas import on_primary
+
+WEIGHTS = {
+    'major': 3.0,
+    'gig-major': 2.0,
+    'subject': 2.0,
+    'topic': 1.0,
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'for', 'how', 'i', 'in', 'is', 'it', 'my', 'of',
+    'on', 'or', 'the', 'to', 'what', 'with', 'you', 'your',
+}
+
+# Share of the score given to overlapping availability between two users
+AVAILABILITY_WEIGHT = 0.15
+
+
+def _words(text):
+    return [w for w in re.findall(r'\w+', (text or '').lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def build_vector(major, gigs, post_titles):
+    """Return ``{feature: weight}`` normalised to unit length.
+
+    ``gigs`` is an iterable of ``(major, subject)`` pairs.
+    """
+    vector = defaultdict(float)
+    if major:
+        vector['major:' + major.strip().lower()] += WEIGHTS['major']
+    for gig_major, subject in gigs:
+        vector['major:' + gig_major.strip().lower()] += WEIGHTS['gig-major']
+        for word in _words(subject):
+            vector['subject:' + word] += WEIGHTS['subject']
+    for title in post_titles:
+        for word in _words(title):
+            vector['topic:' + word] += WEIGHTS['topic']
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {feature: w / norm for feature, w in vector.items()} if norm else {}
+
+
+class Match:
+    """A suggested partner with score and shared interests."""
+
+    def __init__(self, user_id, score, shared, overlap):
+        self.user_id = user_id
+        self.score = score
+        self.shared = shared
+        self.overlap = overlap
+        self.user = None
+
+
+class MatchIndex:
+    """Inverted index of student feature vectors, updated incrementally."""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.vectors = {}
+        self.postings = defaultdict(dict)
+        self.availability = {}
+        self.stale = set()
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def _load(self, user_ids=None):
+        """Fetch features from the primary, optionally for some users only."""
+        with on_primary():
+            return self._query_features(user_ids)
+
+    def _query_features(self, user_ids):
+        users = db.session.query(User.id, User.major).filter(User.role == 'student')
+        gigs = db.session.query(Gig.user_id, Gig.major, Gig.subject, Gig.availability)
+        posts = db.session.query(Post.user_id, Post.title)
+        if user_ids is not None:
+            users = users.filter(User.id.in_(user_ids))
+            gigs = gigs.filter(Gig.user_id.in_(user_ids))
+            posts = posts.filter(Post.user_id.in_(user_ids))
+
+        majors = dict(users.all())
+        user_gigs = defaultdict(list)
+        masks = defaultdict(int)
+        for user_id, major, subject, bitmap in gigs.yield_per(1000):
+            user_gigs[user_id].append((major, subject))
+            masks[user_id] |= from_bytes(bitmap)
+        titles = defaultdict(list)
+        for user_id, title in posts.yield_per(1000):
+            titles[user_id].append(title)
+
+        return {user_id: (build_vector(major, user_gigs[user_id], titles[user_id]), masks[user_id])
+                for user_id, major in majors.items()}
+
+    def _remove(self, user_id):
+        for feature in self.vectors.pop(user_id, {}):
+            self.postings[feature].pop(user_id, None)
+            if not self.postings[feature]:
+                del self.postings[feature]
+        self.availability.pop(user_id, None)
+
+    def _add(self, user_id, vector, mask):
+        if not vector:
+            return
+        self.vectors[user_id] = vector
+        self.availability[user_id] = mask
+        for feature, weight in vector.items():
+            self.postings[feature][user_id] = weight
+
+    def rebuild(self):
+        loaded = self._load()
+        with self.lock:
+            self.vectors, self.postings, self.availability = {}, defaultdict(dict), {}
+            for user_id, (vector, mask) in loaded.items():
+                self._add(user_id, vector, mask)
+            self.stale.clear()
+            self.built_at = time.monotonic()
+
+    def mark_stale(self, user_ids):
+        with self.lock:
+            self.stale.update(user_ids)
+
+    def refresh(self):
+        """Bring the index up to date before answering a query."""
+        if self.built_at is None or time.monotonic() - self.built_at > self.ttl:
+            self.rebuild()
+            return
+        with self.lock:
+            stale, self.stale = self.stale, set()
+        if not stale:
+            return
+        loaded = self._load(stale)
+        with self.lock:
+            for user_id in stale:
+                self._remove(user_id)
+                if user_id in loaded:
+                    self._add(user_id, *loaded[user_id])
+
+    def top_k(self, user_id, k=10):
+        """Best partners for ``user_id``: cosine similarity plus shared free hours."""
+        self.refresh()
+        with self.lock:
+            vector = self.vectors.get(user_id)
+            if not vector:
+                return []
+            scores = defaultdict(float)
+            for feature, weight in vector.items():
+                for other, other_weight in self.postings[feature].items():
+                    if other != user_id:
+                        scores[other] += weight * other_weight
+
+            mask = self.availability.get(user_id, 0)
+            free = mask.bit_count() or 1
+            matches = []
+            for other, similarity in scores.items():
+                overlap = overlap_hours(mask, self.availability.get(other, 0))
+                score = (1 - AVAILABILITY_WEIGHT) * similarity + AVAILABILITY_WEIGHT * overlap / free
+                matches.append((score, other, overlap))
+            best = heapq.nlargest(k, matches)
+            return [Match(other, score,
+                          sorted(f.split(':', 1)[1] for f in vector.keys() & self.vectors[other].keys()),
+                          overlap)
+                    for score, other, overlap in best]
+
+
+def get_index():
+    return current_app.extensions['match_index']
+
+
+def init_app(app):
+    app.extensions['match_index'] = MatchIndex(ttl=app.config['MATCH_INDEX_TTL'])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    """Remember which users' features a flush touched."""
+    changed = session.info.setdefault('match_changed_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Gig, Post)):
+            changed.add(obj.user_id)
+        elif isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _mark_changed_users(session):
+    changed = session.info.pop('match_changed_users', None)
+    if changed and has_app_context() and 'match_index' in current_app.extensions:
+        get_index().mark_stale(changed)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('match_changed_users', None)
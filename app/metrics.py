@@ -0,0 +1,257 @@
+"""Per-endpoint request metrics in Prometheus text format.
+
+For every request we record latency (as a histogram), status, the number
+of SQL statements and the time spent in them (engine cursor events), and
+the time spent rendering templates (Flask's template signals, outermost
+render only, so cached fragments rendered inside a page aren't counted
+twice). Updates are a handful of additions under one lock.
+
+Each gunicorn worker keeps its own numbers. With ``METRICS_DIR`` set,
+workers also write a snapshot there every ``METRICS_FLUSH_INTERVAL``
+seconds and the metrics page adds up all live workers' snapshots.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import before_render_template, current_app, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'unishare'
+
+_local = threading.local()
+
+
+class RequestStats:
+    __slots__ = ('start', 'sql_count', 'sql_seconds', 'template_seconds', 'template_depth',
+                 'template_start')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.template_start = 0.0
+
+
+class Registry:
+    """Counters keyed by ``(endpoint, method)``."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, seconds, stats):
+        key = (endpoint, method)
+        with self._lock:
+            entry = self.endpoints.get(key)
+            if entry is None:
+                entry = self.endpoints[key] = {
+                    'buckets': [0] * (len(BUCKETS) + 1), 'count': 0, 'sum': 0.0, 'status': {},
+                    'sql_count': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0,
+                }
+            entry['buckets'][bisect_left(BUCKETS, seconds)] += 1
+            entry['count'] += 1
+            entry['sum'] += seconds
+            entry['status'][status] = entry['status'].get(status, 0) + 1
+            entry['sql_count'] += stats.sql_count
+            entry['sql_seconds'] += stats.sql_seconds
+            entry['template_seconds'] += stats.template_seconds
+
+    def snapshot(self):
+        with self._lock:
+            return [[endpoint, method, {**entry, 'buckets': list(entry['buckets']),
+                                        'status': dict(entry['status'])}]
+                    for (endpoint, method), entry in self.endpoints.items()]
+
+
+def merge(snapshots):
+    """Add up several ``Registry.snapshot()`` lists."""
+    merged = {}
+    for snapshot in snapshots:
+        for endpoint, method, entry in snapshot:
+            total = merged.get((endpoint, method))
+            if total is None:
+                merged[(endpoint, method)] = {**entry, 'buckets': list(entry['buckets']),
+                                              'status': dict(entry['status'])}
+                continue
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            for name in ('count', 'sum', 'sql_count', 'sql_seconds', 'template_seconds'):
+                total[name] += entry[name]
+            for status, count in entry['status'].items():
+                total['status'][status] = total['status'].get(status, 0) + count
+    return merged
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{str(value)}"' for name, value in labels.items())
+
+
+def render(merged):
+    """Prometheus text exposition of merged endpoint stats."""
+    lines = []
+
+    def metric(name, kind, help_text):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+    items = sorted(merged.items())
+    metric('http_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+    for (endpoint, method), entry in items:
+        labels = _labels(endpoint=endpoint, method=method)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), entry['buckets']):
+            cumulative += count
+            lines.append(f'{PREFIX}_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{PREFIX}_http_request_duration_seconds_sum{{{labels}}} {entry["sum"]:.6f}')
+        lines.append(f'{PREFIX}_http_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+
+    metric('http_requests_total', 'counter', 'Requests by endpoint and status.')
+    for (endpoint, method), entry in items:
+        for status, count in sorted(entry['status'].items()):
+            lines.append(f'{PREFIX}_http_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+
+    for name, key, help_text, fmt in (
+        ('sql_queries_total', 'sql_count', 'SQL statements executed while handling requests.', '{}'),
+        ('sql_duration_seconds_total', 'sql_seconds', 'Time spent in SQL statements.', '{:.6f}'),
+        ('template_render_seconds_total', 'template_seconds', 'Time spent rendering templates.', '{:.6f}'),
+    ):
+        metric(name, 'counter', help_text)
+        for (endpoint, method), entry in items:
+            value = fmt.format(entry[key])
+            lines.append(f'{PREFIX}_{name}{{{_labels(endpoint=endpoint, method=method)}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsCollector:
+    def __init__(self, directory=None, flush_interval=10):
+        self.registry = Registry()
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self):
+        """Write this worker's snapshot for the others to read."""
+        self._last_flush = time.monotonic()
+        path = self._path(os.getpid())
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """Merged stats from every live worker (or just this one)."""
+        if not self.directory:
+            return merge([self.registry.snapshot()])
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            pid = int(name[len('metrics-'):-len('.json')])
+            path = os.path.join(self.directory, name)
+            if not _pid_alive(pid):
+                os.remove(path)
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merge(snapshots)
+
+
+def get_collector():
+    return current_app.extensions['metrics']
+
+
+def _before_request():
+    _local.stats = RequestStats()
+
+
+def _after_request(response):
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        _local.stats = None
+        collector = get_collector()
+        collector.registry.observe(request.endpoint or 'unmatched', request.method,
+                                   response.status_code, time.perf_counter() - stats.start, stats)
+        collector.maybe_flush()
+    return response
+
+
+def _teardown_request(exc):
+    # requests that raised never reach after_request
+    _local.stats = None
+
+
+def _template_started(sender, template, context, **extra):
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        if stats.template_depth == 0:
+            stats.template_start = time.perf_counter()
+        stats.template_depth += 1
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = getattr(_local, 'stats', None)
+    if stats is not None and stats.template_depth:
+        stats.template_depth -= 1
+        if stats.template_depth == 0:
+            stats.template_seconds += time.perf_counter() - stats.template_start
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'stats', None) is not None:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_local, 'stats', None)
+    starts = conn.info.get('metrics_query_start')
+    if stats is not None and starts:
+        stats.sql_count += 1
+        stats.sql_seconds += time.perf_counter() - starts.pop()
+
+
+@event.listens_for(Engine, 'handle_error')
+def _sql_failed(context):
+    starts = context.connection.info.get('metrics_query_start') if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def init_app(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.extensions['metrics'] = MetricsCollector(app.config['METRICS_DIR'],
+                                                 app.config['METRICS_FLUSH_INTERVAL'])
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
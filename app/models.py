@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app import availability, excerpts, passwords
 
 
 class User(UserMixin, db.Model):
@@ -15,21 +15,32 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False, default='student')  # student, teacher, admin
     bio = db.Column(db.Text, nullable=True)
     profile_picture = db.Column(db.String(255), nullable=True)
+    avatar_ready = db.Column(db.Boolean, nullable=False, default=True)  # False while variants render
     major = db.Column(db.String(100), nullable=True)  # For students
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    gigs = db.relationship('Gig', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    posts = db.relationship('Post', backref='author', lazy='dynamic', cascade='all, delete-orphan')
-    courses = db.relationship('Course', backref='teacher', lazy='dynamic', cascade='all, delete-orphan')
+    # Owned rows are removed by the database's ON DELETE CASCADE rather than
+    # loaded and deleted one by one; delete users with app.user_delete
+    gigs = db.relationship('Gig', backref='user', lazy='dynamic', cascade='all, delete-orphan',
+                           passive_deletes=True)
+    posts = db.relationship('Post', backref='author', lazy='dynamic', cascade='all, delete-orphan',
+                            passive_deletes=True)
+    courses = db.relationship('Course', backref='teacher', lazy='dynamic', cascade='all, delete-orphan',
+                              passive_deletes=True)
     
     def set_password(self, password):
         """Hash and set password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
         """Check if password matches hash."""
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash uses outdated parameters."""
+        return passwords.needs_rehash(self.password_hash)
     
     def is_admin(self):
         """Check if user is admin."""
@@ -50,34 +61,80 @@ class User(UserMixin, db.Model):
 class Gig(db.Model):
     """Gig model for tutoring availability."""
     __tablename__ = 'gigs'
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id)
+        db.Index('ix_gigs_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     major = db.Column(db.String(100), nullable=False)
     available_hours = db.Column(db.String(255), nullable=False)
+    availability = db.Column(db.LargeBinary(availability.BITMAP_BYTES), nullable=True)  # weekly hour bitmap
     subject = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    slots = db.relationship('GigSlot', cascade='all, delete-orphan', passive_deletes=True)
+    # Hours shared with a student's free time, when list_gigs filters on it
+    overlap = db.query_expression()
+    
+    @property
+    def availability_mask(self):
+        """Availability bitmap as an int."""
+        return availability.from_bytes(self.availability)
+    
+    def set_availability(self, text):
+        """Parse availability text and update the bitmap and slot index."""
+        mask = availability.parse_availability(text)
+        self.available_hours = text
+        self.availability = availability.to_bytes(mask)
+        current = {slot.slot: slot for slot in self.slots}
+        self.slots = [current.get(s) or GigSlot(slot=s) for s in availability.iter_slots(mask)]
+    
+    def __repr__(self):
+        return f'<Gig {self.subject} by user {self.user_id}>'
+
+
+class GigSlot(db.Model):
+    """Inverted index from weekly hour slot (0-167) to the gigs available then."""
+    __tablename__ = 'gig_slots'
+    
+    slot = db.Column(db.SmallInteger, primary_key=True)
+    gig_id = db.Column(db.Integer, db.ForeignKey('gigs.id', ondelete='CASCADE'), primary_key=True, index=True)
     
     def __repr__(self):
-        return f'<Gig {self.subject} by {self.user.username}>'
+        return f'<GigSlot {self.slot} gig {self.gig_id}>'
 
 
 class Post(db.Model):
     """Post model for blog posts."""
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id)
+        db.Index('ix_posts_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    # Derived from content by set_content; listings read these instead
+    excerpt = db.Column(db.String(excerpts.EXCERPT_LENGTH + len(excerpts.ELLIPSIS)), nullable=False)
+    word_count = db.Column(db.Integer, nullable=False)
+    reading_time = db.Column(db.Integer, nullable=False)  # minutes
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def get_preview(self, length=200):
+    def set_content(self, text):
+        """Set the body and the excerpt, word count and reading time."""
+        self.content = text
+        for name, value in excerpts.summarize(text).items():
+            setattr(self, name, value)
+    
+    def get_preview(self):
         """Get preview of post content."""
-        if len(self.content) > length:
-            return self.content[:length] + '...'
-        return self.content
+        return self.excerpt
     
     def __repr__(self):
         return f'<Post {self.title}>'
@@ -86,13 +143,61 @@ class Post(db.Model):
 class Course(db.Model):
     """Course model for course resources."""
     __tablename__ = 'courses'
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id)
+        db.Index('ix_courses_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
     link = db.Column(db.String(500), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Course {self.title}>'
+
+
+class SiteStatistics(db.Model):
+    """Running content totals for the admin dashboard (a single row)."""
+    __tablename__ = 'site_statistics'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    gigs = db.Column(db.Integer, nullable=False, default=0)
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    courses = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SiteStatistics users={self.users} gigs={self.gigs} posts={self.posts} courses={self.courses}>'
+
+
+class DailyStatistics(db.Model):
+    """Number of users and items created on each day that still exist."""
+    __tablename__ = 'daily_statistics'
+    
+    day = db.Column(db.Date, primary_key=True)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    gigs = db.Column(db.Integer, nullable=False, default=0)
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    courses = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyStatistics {self.day}>'
+
+
+class StoredFile(db.Model):
+    """An uploaded blob, keyed by the SHA-256 of its content."""
+    __tablename__ = 'stored_files'
+    
+    digest = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    content_type = db.Column(db.String(100), nullable=True)
+    refcount = db.Column(db.Integer, nullable=False, default=1)  # users pointing at this blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<StoredFile {self.digest[:12]} refs={self.refcount}>'
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import abort
+from sqlalchemy import and_, or_
+
+
+class KeysetPage:
+    """One page of keyset-paginated results."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def encode_cursor(values):
+    """Encode a row's sort key as an opaque URL-safe token."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token, columns):
+    """Decode a cursor token back into values typed like ``columns``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError(token)
+        values = []
+        for column, value in zip(columns, payload):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, binascii.Error, NotImplementedError):
+        abort(400)
+
+
+def _row_key(item, columns):
+    return [getattr(item, column.key) for column in columns]
+
+
+def _seek(columns, values, descending):
+    """Build ``(c1, c2, ...) < (v1, v2, ...)`` expanded for any backend."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, columns, per_page, after=None, before=None, descending=True):
+    """Paginate ``query`` by seeking past a cursor on ``columns``.
+
+    ``columns`` must end with a unique column (usually the primary key) so
+    the ordering is total. Each page costs one indexed range scan of
+    ``per_page + 1`` rows, however deep the user has paged.
+    """
+    if before:
+        values = decode_cursor(before, columns)
+        order = [c.asc() if descending else c.desc() for c in columns]
+        rows = (query.filter(_seek(columns, values, not descending))
+                .order_by(*order).limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        if not items:
+            return KeysetPage(items)
+        return KeysetPage(items,
+                          next_cursor=encode_cursor(_row_key(items[-1], columns)),
+                          prev_cursor=encode_cursor(_row_key(items[0], columns)) if has_more else None)
+
+    if after:
+        query = query.filter(_seek(columns, decode_cursor(after, columns), descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if not items:
+        return KeysetPage(items)
+    return KeysetPage(items,
+                      next_cursor=encode_cursor(_row_key(items[-1], columns)) if has_more else None,
+                      prev_cursor=encode_cursor(_row_key(items[0], columns)) if after else None)
+
+
+def page_args(args):
+    """Request args to carry over into next/prev links."""
+    return {k: v for k, v in args.items() if v and k not in ('after', 'before')}
@@ -0,0 +1,120 @@
+"""Password hashing with configurable cost.
+
+``PASSWORD_HASH_METHOD`` takes Werkzeug's method syntax
+(``scrypt:<n>:<r>:<p>`` or ``pbkdf2:<hash>:<iterations>``); pick values
+with ``flask passwords calibrate``. Hashes stored with other parameters are
+upgraded the next time their owner logs in.
+
+Hashing runs on a small per-process thread pool (``hashlib`` releases the
+GIL), so at most ``PASSWORD_HASH_WORKERS`` hashes compete for the CPU at
+once and a login burst queues up behind them; beyond
+``PASSWORD_HASH_QUEUE`` waiting requests, logins get a 503 instead of
+piling up.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+SCRYPT_DEFAULTS = (2 ** 15, 8, 1)
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    """Per-process pool, created lazily so forked workers don't share threads."""
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = app.config['PASSWORD_HASH_WORKERS']
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+            _slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def _run(func, *args):
+    app = current_app._get_current_object()
+    executor, slots = _get_executor(app)
+    if not slots.acquire(timeout=app.config['PASSWORD_HASH_TIMEOUT']):
+        raise ServiceUnavailable('Too many sign-ins at once, please try again in a moment.')
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def normalize_method(method):
+    """Spell out the defaults Werkzeug would fill in for ``method``."""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        values = [int(a) for a in args] + list(SCRYPT_DEFAULTS[len(args):])
+        return 'scrypt:{}:{}:{}'.format(*values)
+    if name == 'pbkdf2':
+        digest = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{digest}:{iterations}'
+    return method
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Whether ``pwhash`` was made with other parameters than configured."""
+    stored = pwhash.split('$', 1)[0]
+    return stored != normalize_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _time_method(method, rounds):
+    import statistics  # calibration only; not worth importing in every worker
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        generate_password_hash('calibration-password', method)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate(algorithm='scrypt', target=0.25, max_memory=64 * 2 ** 20, rounds=3):
+    """Find the costliest parameters that hash within ``target`` seconds.
+
+    Returns ``(method, seconds)``. For scrypt, ``n`` doubles until the time
+    target or the ``max_memory`` ceiling (128 * n * r bytes per hash) is
+    hit; pbkdf2 iterations are scaled from a sample run. Raises
+    ``ValueError`` if ``max_memory`` is below the smallest scrypt cost.
+    """
+    if algorithm == 'pbkdf2':
+        sample = 100_000
+        elapsed = _time_method(f'pbkdf2:sha256:{sample}', rounds)
+        iterations = max(int(sample * target / elapsed) // 1000 * 1000, 1000)
+        method = f'pbkdf2:sha256:{iterations}'
+        return method, _time_method(method, rounds)
+
+    _, r, p = SCRYPT_DEFAULTS
+    best = None
+    n = smallest = 2 ** 12
+    while 128 * n * r <= max_memory:
+        method = f'scrypt:{n}:{r}:{p}'
+        elapsed = _time_method(method, rounds)
+        if elapsed > target and best is not None:
+            break
+        best = (method, elapsed)
+        if elapsed > target:
+            break
+        n *= 2
+    if best is None:
+        raise ValueError(f'scrypt needs at least {128 * smallest * r // 2 ** 20} MiB per hash '
+                         f'(n={smallest}, r={r}).')
+    return best
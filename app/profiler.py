@@ -0,0 +1,268 @@
+"""Sampling CPU profiler that can be switched on in a running deployment.
+
+While a profiling session is active, a background thread in each worker
+wakes every ``interval`` seconds, reads the stacks of threads that are
+serving a profiled request (``sys._current_frames``) and counts them as
+collapsed stacks (``endpoint;module:func;...``), the input format of
+flamegraph.pl and speedscope. Requests are picked by sample rate and/or
+endpoint; the avatar and password-hash pools can be included too.
+
+Settings live in a JSON file under ``PROFILER_DIR`` that every worker
+re-reads at most once a second, so the admin page can start and stop a
+session across all gunicorn workers without a restart; each worker writes
+its counts next to it and the download merges them. Sessions stop by
+themselves after their duration. The sampler backs off (doubling its
+interval) when taking samples costs more than ``MAX_OVERHEAD`` of the
+time, so overhead stays bounded.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from flask import current_app, request
+
+SETTINGS_FILE = 'settings.json'
+SAMPLES_PREFIX = 'samples-'
+BACKGROUND_THREADS = ('avatar', 'pwhash')
+MAX_DEPTH = 128
+MAX_STACKS = 20000
+MAX_OVERHEAD = 0.05
+FLUSH_INTERVAL = 2.0
+SETTINGS_CHECK_INTERVAL = 1.0
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    # compiled Jinja templates have no module name; their filename is the template
+    module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+    return f'{module}:{getattr(code, "co_qualname", code.co_name)}'
+
+
+def collapse(frame, root):
+    """``root;outermost;...;innermost`` for ``frame``'s stack."""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ';'.join(reversed(labels))
+
+
+class Profiler:
+    def __init__(self, directory):
+        self.directory = directory
+        self.settings = {}
+        self.counts = Counter()
+        self.dropped = 0
+        self._active = {}  # thread id -> endpoint
+        self._lock = threading.Lock()
+        self._settings_checked = 0.0
+        self._settings_mtime = None
+        self._thread = None
+        self._pid = None
+        os.makedirs(directory, exist_ok=True)
+
+    # -- settings shared through the filesystem --
+
+    def _settings_path(self):
+        return os.path.join(self.directory, SETTINGS_FILE)
+
+    def _samples_path(self, pid=None):
+        return os.path.join(self.directory, f'{SAMPLES_PREFIX}{pid or os.getpid()}.txt')
+
+    def write_settings(self, settings):
+        path = self._settings_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(settings, f)
+        os.replace(path + '.tmp', path)
+        self._settings_checked = 0.0
+
+    def refresh_settings(self):
+        """Re-read the settings file if it changed; cheap enough per request."""
+        now = time.monotonic()
+        if now - self._settings_checked < SETTINGS_CHECK_INTERVAL:
+            return self.settings
+        self._settings_checked = now
+        try:
+            mtime = os.stat(self._settings_path()).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._settings_mtime:
+            self._settings_mtime = mtime
+            previous = self.settings.get('session')
+            try:
+                with open(self._settings_path()) as f:
+                    self.settings = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.settings = {}
+            if self.settings.get('session') != previous:
+                with self._lock:
+                    self.counts.clear()
+                    self.dropped = 0
+        return self.settings
+
+    def is_running(self):
+        settings = self.refresh_settings()
+        return bool(settings.get('session')) and settings.get('until', 0) > time.time()
+
+    def start(self, rate=1.0, endpoint=None, background=False, duration=300, interval_ms=10):
+        """Start a new session in every worker, discarding the previous samples."""
+        self.clear()
+        self.write_settings({
+            'session': f'{time.time():.6f}', 'rate': rate, 'endpoint': endpoint or None,
+            'background': background, 'interval': interval_ms / 1000, 'until': time.time() + duration,
+        })
+
+    def stop(self):
+        """End the session; its samples stay available for download."""
+        self.write_settings({**self.refresh_settings(), 'until': 0})
+
+    # -- request selection --
+
+    def should_profile(self, endpoint):
+        if not self.is_running():
+            return False
+        wanted = self.settings.get('endpoint')
+        if wanted and endpoint != wanted:
+            return False
+        return random.random() < self.settings.get('rate', 1.0)
+
+    def enter(self, endpoint):
+        self._ensure_sampler()
+        self._active[threading.get_ident()] = endpoint
+
+    def leave(self):
+        self._active.pop(threading.get_ident(), None)
+
+    # -- sampling --
+
+    def _ensure_sampler(self):
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+
+    def _targets(self):
+        targets = dict(self._active)
+        if self.settings.get('background'):
+            for thread in threading.enumerate():
+                if thread.name.startswith(BACKGROUND_THREADS):
+                    targets.setdefault(thread.ident, f'[{thread.name.split("_")[0]}]')
+        return targets
+
+    def _sample(self, me):
+        targets = self._targets()
+        if not targets:
+            return
+        frames = sys._current_frames()
+        stacks = [collapse(frames[ident], root) for ident, root in targets.items()
+                  if ident != me and ident in frames]
+        with self._lock:
+            for stack in stacks:
+                if stack in self.counts or len(self.counts) < MAX_STACKS:
+                    self.counts[stack] += 1
+                else:
+                    self.dropped += 1
+
+    def _run(self):
+        me = threading.get_ident()
+        last_flush = time.monotonic()
+        while self.is_running():
+            interval = self.settings.get('interval', 0.01)
+            start = time.perf_counter()
+            self._sample(me)
+            cost = time.perf_counter() - start
+            if cost > interval * MAX_OVERHEAD:
+                interval = min(interval * 2, 1.0)
+                self.settings['interval'] = interval
+            if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                self.flush()
+                last_flush = time.monotonic()
+            time.sleep(interval)
+        self.flush()
+
+    def flush(self):
+        """Write this worker's counts for the download to merge."""
+        with self._lock:
+            lines = [f'{stack} {count}\n' for stack, count in self.counts.items()]
+        path = self._samples_path()
+        with open(path + '.tmp', 'w') as f:
+            f.write(f'# session {self.settings.get("session")}\n')
+            f.writelines(lines)
+        os.replace(path + '.tmp', path)
+
+    # -- reporting --
+
+    def collected(self):
+        """Collapsed-stack counts of the current session from every worker."""
+        session = self.refresh_settings().get('session')
+        if os.getpid() == self._pid:
+            self.flush()
+        totals = Counter()
+        for name in os.listdir(self.directory):
+            if not (name.startswith(SAMPLES_PREFIX) and name.endswith('.txt')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    header = f.readline().strip()
+                    if header != f'# session {session}':
+                        continue
+                    for line in f:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack:
+                            totals[stack] += int(count)
+            except (OSError, ValueError):
+                continue
+        return totals
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.startswith(SAMPLES_PREFIX):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self.counts.clear()
+            self.dropped = 0
+        settings = self.refresh_settings()
+        if settings.get('session'):
+            # a new session id makes the other workers drop their counts too
+            self.write_settings({**settings, 'session': f'{time.time():.6f}'})
+
+
+def render(counts):
+    """Collapsed-stack text, one ``stack count`` line per stack."""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(counts.items()))
+
+
+def per_endpoint(counts):
+    """Sample totals by root frame, busiest first."""
+    totals = Counter()
+    for stack, count in counts.items():
+        totals[stack.split(';', 1)[0]] += count
+    return totals.most_common()
+
+
+def get_profiler():
+    return current_app.extensions['profiler']
+
+
+def _before_request():
+    profiler = get_profiler()
+    endpoint = request.endpoint or 'unmatched'
+    if profiler.should_profile(endpoint):
+        profiler.enter(endpoint)
+
+
+def _teardown_request(exc):
+    get_profiler().leave()
+
+
+def init_app(app):
+    app.extensions['profiler'] = Profiler(app.config['PROFILER_DIR'])
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
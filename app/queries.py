@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import defer, joinedload
+from app.models import Gig, Post, Course
+
+
+# Many-to-one relationship from each content model to the user who owns it
+OWNER_RELATIONSHIPS = {
+    Post: 'author',
+    Gig: 'user',
+    Course: 'teacher',
+}
+
+# Large columns that listings don't show; a detail view undefers them
+LISTING_DEFERRED = {
+    Post: ('content',),
+}
+
+
+def listing_query(model, full=False):
+    """Query ``model`` with its owning user joined into the same SELECT.
+
+    Columns in ``LISTING_DEFERRED`` are left out of the SELECT unless
+    ``full`` is set, as it is for a detail view.
+    """
+    query = model.query.options(joinedload(getattr(model, OWNER_RELATIONSHIPS[model])))
+    return query if full else query.options(*deferred_options(model))
+
+
+def deferred_options(model):
+    """Loader options that defer ``model``'s ``LISTING_DEFERRED`` columns."""
+    return [defer(getattr(model, name)) for name in LISTING_DEFERRED.get(model, ())]
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a view issues more SQL statements than it declared."""
+
+
+class QueryCounter:
+    """Counts SQL statements executed on the current thread."""
+
+    def __init__(self):
+        self.count = 0
+
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.count += 1
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements issued inside the ``with`` block."""
+    counter = QueryCounter()
+    counters = _local.__dict__.setdefault('counters', [])
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def query_budget(limit):
+    """Decorator declaring how many SQL statements a view may issue.
+
+    Going over budget raises ``QueryBudgetExceeded`` when testing or when
+    ``QUERY_BUDGET_STRICT`` is set, and logs a warning otherwise.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with count_queries() as counter:
+                rv = f(*args, **kwargs)
+            if counter.count > limit:
+                message = f'{f.__name__} issued {counter.count} queries (budget {limit})'
+                if current_app.testing or current_app.config['QUERY_BUDGET_STRICT']:
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return rv
+        return decorated_function
+    return decorator
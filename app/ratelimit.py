@@ -0,0 +1,118 @@
+"""Sliding-window rate limiting.
+
+Each limit counts hits in fixed windows and weighs the previous window by
+how much of it still overlaps the sliding one, which approximates a true
+sliding log in two counters per key. Counters live in a bounded
+in-process store, or in Redis when ``REDIS_URL`` is set so every worker
+shares them. Route policies are declared with
+``app.decorators.rate_limit``; the auth policies live in ``RATELIMIT_*``
+config keys.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from flask import current_app
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+@lru_cache(maxsize=None)
+def parse_limit(text):
+    """``'5/minute'`` -> ``(5, 60)``."""
+    count, _, period = text.partition('/')
+    try:
+        return int(count), PERIODS[period.strip().rstrip('s')]
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid rate limit {text!r}')
+
+
+def _weighted(current, previous, now, period):
+    """Hits in the last ``period`` seconds, estimated from two windows."""
+    elapsed = (now % period) / period
+    return current + previous * (1 - elapsed)
+
+
+class MemoryStore:
+    """Per-process counters, evicting the least recently used keys."""
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, period, now):
+        window = int(now // period)
+        with self._lock:
+            start, current, previous = self._counters.pop(key, (window, 0, 0))
+            if window == start + 1:
+                previous, current = current, 0
+            elif window != start:
+                previous, current = 0, 0
+            current += 1
+            self._counters[key] = (window, current, previous)
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+        return _weighted(current, previous, now, period)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisStore:
+    """Counters shared by every worker."""
+
+    prefix = 'unishare:rl:'
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('REDIS_URL requires the redis package (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+
+    def hit(self, key, period, now):
+        window = int(now // period)
+        current_key = f'{self.prefix}{key}:{window}'
+        with self.client.pipeline() as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, period * 2)
+            pipe.get(f'{self.prefix}{key}:{window - 1}')
+            current, _, previous = pipe.execute()
+        return _weighted(int(current), int(previous or 0), now, period)
+
+    def reset(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+
+    def hit(self, key, count, period):
+        """Record a hit; return seconds to wait if ``key`` is over its limit."""
+        now = time.time()
+        if self.store.hit(key, period, now) <= count:
+            return None
+        # the oldest counted hits leave the window at the next boundary
+        return max(1, int(period - now % period))
+
+
+def get_limiter():
+    return current_app.extensions['rate_limiter']
+
+
+def init_app(app):
+    # catch a mistyped policy at startup rather than on the first POST
+    for name, value in app.config.items():
+        if name.startswith('RATELIMIT_') and isinstance(value, str):
+            parse_limit(value)
+    store = RedisStore(app.config['REDIS_URL']) if app.config['REDIS_URL'] else MemoryStore()
+    app.extensions['rate_limiter'] = RateLimiter(store)
@@ -0,0 +1,133 @@
+"""Read-replica routing.
+
+With ``DATABASE_REPLICA_URLS`` set, each replica becomes a Flask-SQLAlchemy
+bind (``replica0``, ``replica1``, ...) and ``db.session`` is a
+``RoutingSession``. In a GET/HEAD request, SELECTs go to one replica, picked
+per request so its reads are consistent with each other. Everything else
+goes to the primary: writes, flushes, ``FOR UPDATE``, raw connections, and
+work outside requests (CLI, avatar pool). Once a session has written, it
+stays on the primary for the rest of the request. Reads that fill a cache
+shared beyond the request (identity cache, match index) run inside
+``on_primary()``, since a lagging replica's rows would outlive the lag there.
+
+A request that wrote sets a short-lived ``db_pin`` cookie. That client
+then reads from the primary for ``REPLICA_PIN_SECONDS``, so it sees its
+own new post even if the replicas lag. A replica that can't be connected
+to is skipped for ``REPLICA_RETRY_SECONDS`` and the request falls back to
+the primary.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+BIND_PREFIX = 'replica'
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class ReplicaSet:
+    """The replica bind keys of one process and which of them are down."""
+
+    def __init__(self, names, retry_seconds=30):
+        self.names = list(names)
+        self.retry = retry_seconds
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        now = time.monotonic()
+        return [name for name in self.names if self._down_until.get(name, 0) <= now]
+
+    def choose(self):
+        names = self.available()
+        return random.choice(names) if names else None
+
+    def mark_down(self, name):
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.retry
+
+
+def _replica_allowed():
+    return has_request_context() and g.get('read_replica', False)
+
+
+class RoutingSession(Session):
+    """``db.session`` that sends a read-only request's SELECTs to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif (getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+                    and not self.info.get('wrote') and not self.info.get('primary')
+                    and _replica_allowed()):
+                engine = self._replica_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        """This session's replica, connected on first use; None means the primary."""
+        name = self.info.get('replica')
+        if name is None:
+            replicas = current_app.extensions['replicas']
+            name = replicas.choose() or ''
+            if name:
+                try:
+                    self.connection(bind_arguments={'bind': self._db.engines[name]})
+                except DBAPIError:
+                    current_app.logger.warning('Replica %s unavailable, reading from the primary', name)
+                    replicas.mark_down(name)
+                    name = ''
+            self.info['replica'] = name
+        return self._db.engines[name] if name else None
+
+
+@contextmanager
+def on_primary():
+    """Send the block's reads to the primary, e.g. to fill a shared cache."""
+    from app import db
+    info = db.session().info
+    info['primary'] = info.get('primary', 0) + 1
+    try:
+        yield
+    finally:
+        info['primary'] -= 1
+
+
+def _before_request():
+    pinned_until = request.cookies.get(PIN_COOKIE, '')
+    g.read_replica = (request.method in SAFE_METHODS
+                      and not (pinned_until.isdigit() and int(pinned_until) > time.time()))
+
+
+def _after_request(response):
+    from app import db
+    if db.session.info.get('wrote'):
+        seconds = current_app.config['REPLICA_PIN_SECONDS']
+        response.set_cookie(PIN_COOKIE, str(int(time.time() + seconds)), max_age=seconds,
+                            httponly=True, samesite='Lax', secure=request.is_secure)
+    return response
+
+
+def init_app(app):
+    names = [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith(BIND_PREFIX)]
+    if not names:
+        return
+    replicas = app.extensions['replicas'] = ReplicaSet(names, app.config['REPLICA_RETRY_SECONDS'])
+
+    from app import db
+    with app.app_context():
+        for name in names:
+            def on_error(context, name=name):
+                # a replica that drops connections mid-request is skipped for a while
+                if context.is_disconnect:
+                    replicas.mark_down(name)
+            event.listen(db.engines[name], 'handle_error', on_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
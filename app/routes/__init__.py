@@ -6,5 +6,6 @@ from app.routes.courses import bp as courses_bp
 from app.routes.profile import bp as profile_bp
 from app.routes.admin import bp as admin_bp
 from app.routes.setup import bp as setup_bp
+from app.routes.search import bp as search_bp
 
-__all__ = ['auth_bp', 'gigs_bp', 'posts_bp', 'courses_bp', 'profile_bp', 'admin_bp']
+__all__ = ['auth_bp', 'gigs_bp', 'posts_bp', 'courses_bp', 'profile_bp', 'admin_bp', 'search_bp']
@@ -1,60 +1,144 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+import time
+from datetime import datetime, timedelta
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, abort,
+                   current_app, Response, stream_with_context)
 from flask_login import login_required
 from app import db
 from app.models import User, Gig, Post, Course
 from app.forms import AdminCreateUserForm
 from app.decorators import admin_required
+from app.queries import listing_query, query_budget
+from app.cache import fragment_cache
+from app.stats import get_statistics, recent_days
+from app.pagination import keyset_paginate, page_args
+from app.export import FORMATS, stream_rows
+from app.user_delete import delete_users
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+ROLES = ('student', 'teacher', 'admin')
+USER_SORTS = {
+    'joined': User.created_at,
+    'username': User.username,
+    'email': User.email,
+}
+
+# type -> (model, owner id column, title column)
+CONTENT_TYPES = {
+    'posts': (Post, Post.user_id, Post.title),
+    'gigs': (Gig, Gig.user_id, Gig.subject),
+    'courses': (Course, Course.teacher_id, Course.title),
+}
+
+EXPORT_COLUMNS = {
+    'users': (User.id, User.username, User.email, User.role, User.major, User.created_at),
+    'posts': (Post.id, Post.user_id, User.username, Post.title, Post.content,
+              Post.created_at, Post.updated_at),
+    'gigs': (Gig.id, Gig.user_id, User.username, Gig.major, Gig.subject,
+             Gig.available_hours, Gig.created_at),
+    'courses': (Course.id, Course.teacher_id, User.username, Course.title,
+                Course.description, Course.link, Course.created_at),
+}
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def _filter_dates(query, column, args):
+    """Apply inclusive ``from``/``to`` day filters."""
+    start, end = _parse_day(args.get('from')), _parse_day(args.get('to'))
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
+
+
+def _filter_users(query, args):
+    search = args.get('search', '')
+    if search:
+        query = query.filter(
+            (User.username.contains(search)) | 
+            (User.email.contains(search))
+        )
+    if args.get('role') in ROLES:
+        query = query.filter(User.role == args['role'])
+    return _filter_dates(query, User.created_at, args)
+
+
+def _filter_content(query, content_type, args):
+    model, owner_id, _ = CONTENT_TYPES[content_type]
+    if args.get('author'):
+        query = query.filter(owner_id.in_(
+            db.session.query(User.id).filter(User.username == args['author'])))
+    if args.get('role') in ROLES:
+        query = query.filter(owner_id.in_(
+            db.session.query(User.id).filter(User.role == args['role'])))
+    return _filter_dates(query, model.created_at, args)
+
+
+def _sort(args, default):
+    return args.get('sort', default), args.get('dir', 'desc') != 'asc'
+
 
 @bp.route('/dashboard')
 @login_required
 @admin_required
+@query_budget(6)
 def dashboard():
     """Admin dashboard with statistics."""
-    total_users = User.query.count()
-    total_gigs = Gig.query.count()
-    total_posts = Post.query.count()
-    total_courses = Course.query.count()
+    stats = get_statistics()
+    growth = recent_days(14)
     
     # Recent activity
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-    recent_gigs = Gig.query.order_by(Gig.created_at.desc()).limit(5).all()
+    recent_gigs = listing_query(Gig).order_by(Gig.created_at.desc()).limit(5).all()
     recent_posts = Post.query.order_by(Post.created_at.desc()).limit(5).all()
-    recent_courses = Course.query.order_by(Course.created_at.desc()).limit(5).all()
+    recent_courses = listing_query(Course).order_by(Course.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
                          title='Admin Dashboard',
-                         total_users=total_users,
-                         total_gigs=total_gigs,
-                         total_posts=total_posts,
-                         total_courses=total_courses,
+                         total_users=stats.users,
+                         total_gigs=stats.gigs,
+                         total_posts=stats.posts,
+                         total_courses=stats.courses,
+                         growth=growth,
                          recent_users=recent_users,
                          recent_gigs=recent_gigs,
                          recent_posts=recent_posts,
-                         recent_courses=recent_courses)
+                         recent_courses=recent_courses,
+                         fragment_cache_stats=fragment_cache().stats())
 
 
 @bp.route('/users')
 @login_required
 @admin_required
+@query_budget(2)
 def manage_users():
-    """View and manage all users."""
-    search = request.args.get('search', '')
+    """Search, filter and page through users."""
+    sort, descending = _sort(request.args, 'joined')
+    if sort not in USER_SORTS:
+        sort = 'joined'
     
-    if search:
-        users = User.query.filter(
-            (User.username.contains(search)) | 
-            (User.email.contains(search))
-        ).all()
-    else:
-        users = User.query.order_by(User.created_at.desc()).all()
+    users = keyset_paginate(_filter_users(User.query, request.args),
+                            (USER_SORTS[sort], User.id),
+                            current_app.config['ADMIN_PER_PAGE'],
+                            after=request.args.get('after'),
+                            before=request.args.get('before'),
+                            descending=descending)
     
     return render_template('admin/users.html',
                          title='Manage Users',
                          users=users,
-                         search=search)
+                         search=request.args.get('search', ''),
+                         filters=request.args,
+                         roles=ROLES,
+                         sorts=USER_SORTS,
+                         page_args=page_args(request.args))
 
 
 @bp.route('/users/create', methods=['GET', 'POST'])
@@ -100,8 +184,7 @@ def delete_user(user_id):
         return redirect(url_for('admin.manage_users'))
     
     username = user.username
-    db.session.delete(user)
-    db.session.commit()
+    delete_users([user.id])
     
     flash(f'User {username} has been deleted.', 'info')
     return redirect(url_for('admin.manage_users'))
@@ -110,14 +193,132 @@ def delete_user(user_id):
 @bp.route('/content')
 @login_required
 @admin_required
+@query_budget(2)
 def manage_content():
-    """View and manage all content (gigs, posts, courses)."""
-    gigs = Gig.query.order_by(Gig.created_at.desc()).all()
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    courses = Course.query.order_by(Course.created_at.desc()).all()
+    """Filter and page through one type of content at a time."""
+    content_type = request.args.get('type', 'posts')
+    if content_type not in CONTENT_TYPES:
+        content_type = 'posts'
+    model, _, title_column = CONTENT_TYPES[content_type]
+    sort, descending = _sort(request.args, 'date')
+    sort_column = title_column if sort == 'title' else model.created_at
+    
+    items = keyset_paginate(_filter_content(listing_query(model), content_type, request.args),
+                            (sort_column, model.id),
+                            current_app.config['ADMIN_PER_PAGE'],
+                            after=request.args.get('after'),
+                            before=request.args.get('before'),
+                            descending=descending)
     
     return render_template('admin/content.html',
                          title='Manage Content',
-                         gigs=gigs,
-                         posts=posts,
-                         courses=courses)
+                         content_type=content_type,
+                         items=items,
+                         filters=request.args,
+                         roles=ROLES,
+                         page_args=page_args(request.args))
+
+
+@bp.route('/export/<string:kind>.<string:fmt>')
+@login_required
+@admin_required
+def export(kind, fmt):
+    """Stream users or content as CSV/NDJSON using the current filters."""
+    if kind not in EXPORT_COLUMNS or fmt not in FORMATS:
+        abort(404)
+    
+    columns = EXPORT_COLUMNS[kind]
+    query = db.session.query(*columns)
+    if kind == 'users':
+        query = _filter_users(query, request.args).order_by(User.id)
+    else:
+        model, owner_id, _ = CONTENT_TYPES[kind]
+        query = _filter_content(query.join(User, User.id == owner_id), kind, request.args)
+        query = query.order_by(model.id)
+    
+    # Server-side cursor: rows are fetched and written in batches
+    rows = query.yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+    names = [column.key for column in columns]
+    filename = f'unishare-{kind}-{datetime.utcnow():%Y%m%d}.{fmt}'
+    return Response(stream_with_context(stream_rows(rows, names, fmt)),
+                    mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@bp.route('/slow-queries')
+@login_required
+@admin_required
+def slow_queries():
+    """Recently recorded slow statements and their plans."""
+    from app.slowlog import get_log
+    log = get_log()
+    return render_template('admin/slow_queries.html',
+                         title='Slow Queries',
+                         log=log,
+                         entries=log.recent() if log else [])
+
+
+@bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    """Request metrics in Prometheus text format."""
+    from app.metrics import get_collector, render
+    if 'metrics' not in current_app.extensions:
+        abort(404)
+    return Response(render(get_collector().collect()),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@bp.route('/profiler', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def profiler():
+    """Start, stop or clear a sampling session and show what it collected."""
+    from app.profiler import get_profiler, per_endpoint
+    prof = get_profiler()
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'start':
+            try:
+                rate = min(1.0, max(0.0, float(request.form.get('rate') or 100) / 100))
+                duration = max(10, int(request.form.get('duration') or 300))
+            except ValueError:
+                flash('Sample rate and duration must be numbers.', 'danger')
+                return redirect(url_for('admin.profiler'))
+            prof.start(rate=rate, endpoint=request.form.get('endpoint', '').strip() or None,
+                       background=bool(request.form.get('background')), duration=duration,
+                       interval_ms=current_app.config['PROFILER_INTERVAL_MS'])
+            flash('Profiling started.', 'success')
+        elif action == 'stop':
+            prof.stop()
+            flash('Profiling stopped.', 'info')
+        elif action == 'clear':
+            prof.clear()
+            flash('Samples cleared.', 'info')
+        return redirect(url_for('admin.profiler'))
+    
+    settings = prof.refresh_settings()
+    endpoints = sorted({rule.endpoint for rule in current_app.url_map.iter_rules()})
+    return render_template('admin/profiler.html',
+                         title='Profiler',
+                         settings=settings,
+                         running=prof.is_running(),
+                         remaining=max(0, int(settings.get('until', 0) - time.time())),
+                         totals=per_endpoint(prof.collected()),
+                         endpoints=endpoints)
+
+
+@bp.route('/profiler/download')
+@login_required
+@admin_required
+def profiler_download():
+    """Collapsed stacks of the current session, for flamegraph.pl or speedscope."""
+    from app.profiler import get_profiler, render
+    counts = get_profiler().collected()
+    view = request.args.get('view')
+    if view:
+        counts = {stack: count for stack, count in counts.items() if stack.split(';', 1)[0] == view}
+    filename = f'unishare-profile-{view or "all"}-{datetime.utcnow():%Y%m%d%H%M%S}.folded'
+    return Response(render(counts), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
@@ -4,11 +4,13 @@ from urllib.parse import urlparse
 from app import db
 from app.models import User
 from app.forms import LoginForm, RegistrationForm
+from app.decorators import rate_limit, form_field
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 
 @bp.route('/register', methods=['GET', 'POST'])
+@rate_limit('RATELIMIT_REGISTER_IP')
 def register():
     """User registration."""
     if current_user.is_authenticated:
@@ -37,6 +39,8 @@ def register():
 
 
 @bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('RATELIMIT_LOGIN_IP')
+@rate_limit('RATELIMIT_LOGIN_ACCOUNT', key=form_field('email'))
 def login():
     """User login."""
     if current_user.is_authenticated:
@@ -50,6 +54,11 @@ def login():
             flash('Invalid email or password.', 'danger')
             return redirect(url_for('auth.login'))
         
+        # Upgrade hashes made with old cost parameters while we have the password
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
+        
         login_user(user, remember=form.remember_me.data)
         flash(f'Welcome back, {user.username}!', 'success')
         
@@ -1,18 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import Course
 from app.forms import CourseForm
 from app.decorators import teacher_or_admin_required
+from app.pagination import keyset_paginate, page_args
+from app.queries import listing_query, query_budget
+from app.conditional import render_conditional, listing_validators
 
 bp = Blueprint('courses', __name__, url_prefix='/courses')
 
 
 @bp.route('/')
+@query_budget(3)
 def list_courses():
-    """List all courses."""
-    courses = Course.query.order_by(Course.created_at.desc()).all()
-    return render_template('courses/list.html', title='Courses', courses=courses)
+    """List courses, newest first, one page at a time."""
+    courses = keyset_paginate(listing_query(Course), (Course.created_at, Course.id),
+                              current_app.config['COURSES_PER_PAGE'],
+                              after=request.args.get('after'),
+                              before=request.args.get('before'))
+    validators, last_modified = listing_validators(courses, 'teacher')
+    return render_conditional('courses/list.html',
+                              (validators, courses.next_cursor, courses.prev_cursor),
+                              last_modified,
+                              title='Courses',
+                              courses=courses,
+                              page_args=page_args(request.args))
 
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -1,42 +1,94 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import with_expression
 from app import db
-from app.models import Gig
+from app.models import User, Gig, GigSlot
+from app.availability import parse_availability, iter_slots
 from app.forms import GigForm
+from app.pagination import keyset_paginate, page_args
+from app.queries import listing_query, query_budget
+from app.search import matching_ids
+from app.matching import get_index
+from app.conditional import render_conditional, listing_validators
 
 bp = Blueprint('gigs', __name__, url_prefix='/gigs')
 
 
 @bp.route('/')
+@query_budget(4)
 def list_gigs():
     """List all gigs with optional search/filter."""
     search_query = request.args.get('search', '')
     filter_major = request.args.get('major', '')
+    free_hours = request.args.get('free', '')
     
-    query = Gig.query
+    query = listing_query(Gig)
     
     # Apply filters
-    if search_query:
-        query = query.filter(
-            (Gig.subject.contains(search_query)) | 
-            (Gig.major.contains(search_query))
-        )
+    matches = matching_ids('gig', search_query)
+    if matches is not None:
+        query = query.filter(Gig.id.in_(matches))
     
     if filter_major:
         query = query.filter(Gig.major == filter_major)
     
-    gigs = query.order_by(Gig.created_at.desc()).all()
+    # Only gigs sharing at least one weekly hour slot with the student
+    order = (Gig.created_at, Gig.id)
+    free_mask = 0
+    if free_hours:
+        try:
+            free_mask = parse_availability(free_hours)
+        except ValueError as e:
+            flash(f'Could not read your free time: {e}', 'warning')
+        else:
+            # Most shared hours first, counted from the slot index
+            overlap = (db.session.query(GigSlot.gig_id, func.count().label('overlap'))
+                       .filter(GigSlot.slot.in_(list(iter_slots(free_mask))))
+                       .group_by(GigSlot.gig_id).subquery())
+            query = (query.join(overlap, overlap.c.gig_id == Gig.id)
+                     .options(with_expression(Gig.overlap, overlap.c.overlap)))
+            order = (overlap.c.overlap,) + order
+    
+    gigs = keyset_paginate(query, order,
+                           current_app.config['GIGS_PER_PAGE'],
+                           after=request.args.get('after'),
+                           before=request.args.get('before'))
     
     # Get unique majors for filter dropdown
     all_majors = db.session.query(Gig.major).distinct().all()
     majors = [m[0] for m in all_majors]
     
-    return render_template('gigs/list.html', 
-                         title='Tutoring Gigs',
-                         gigs=gigs,
-                         majors=majors,
-                         search_query=search_query,
-                         filter_major=filter_major)
+    validators, last_modified = listing_validators(gigs, 'user')
+    return render_conditional('gigs/list.html',
+                              (validators, gigs.next_cursor, gigs.prev_cursor, majors),
+                              last_modified,
+                              title='Tutoring Gigs',
+                              gigs=gigs,
+                              majors=majors,
+                              search_query=search_query,
+                              filter_major=filter_major,
+                              free_hours=free_hours,
+                              free_mask=free_mask,
+                              page_args=page_args(request.args))
+
+
+@bp.route('/matches')
+@login_required
+@query_budget(4)
+def matches():
+    """Suggest study partners with similar majors, subjects and free time."""
+    results = get_index().top_k(current_user.id, k=current_app.config['MATCH_RESULTS'])
+    
+    users = User.query.filter(User.id.in_([m.user_id for m in results])).all()
+    by_id = {user.id: user for user in users}
+    for match in results:
+        match.user = by_id.get(match.user_id)
+    results = [match for match in results if match.user is not None]
+    
+    return render_template('gigs/matches.html',
+                         title='Study Partners',
+                         matches=results)
 
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -52,9 +104,9 @@ def create_gig():
         gig = Gig(
             user_id=current_user.id,
             major=form.major.data,
-            subject=form.subject.data,
-            available_hours=form.available_hours.data
+            subject=form.subject.data
         )
+        gig.set_availability(form.available_hours.data)
         db.session.add(gig)
         db.session.commit()
         
@@ -78,7 +130,7 @@ def edit_gig(gig_id):
     if form.validate_on_submit():
         gig.major = form.major.data
         gig.subject = form.subject.data
-        gig.available_hours = form.available_hours.data
+        gig.set_availability(form.available_hours.data)
         db.session.commit()
         
         flash('Your gig has been updated!', 'success')
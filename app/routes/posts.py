@@ -1,24 +1,41 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import Post
 from app.forms import PostForm
+from app.pagination import keyset_paginate, page_args
+from app.queries import listing_query, query_budget
+from app.cache import fragment_cache
+from app.conditional import render_conditional, listing_validators
 
 bp = Blueprint('posts', __name__, url_prefix='/posts')
 
 
 @bp.route('/')
+@query_budget(3)
 def list_posts():
-    """List all blog posts."""
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    return render_template('posts/list.html', title='Blog Posts', posts=posts)
+    """List blog posts, newest first, one page at a time."""
+    posts = keyset_paginate(listing_query(Post), (Post.created_at, Post.id),
+                            current_app.config['POSTS_PER_PAGE'],
+                            after=request.args.get('after'),
+                            before=request.args.get('before'))
+    validators, last_modified = listing_validators(posts, 'author')
+    return render_conditional('posts/list.html',
+                              (validators, posts.next_cursor, posts.prev_cursor),
+                              last_modified,
+                              title='Blog Posts',
+                              posts=posts,
+                              page_args=page_args(request.args))
 
 
 @bp.route('/<int:post_id>')
+@query_budget(3)
 def view_post(post_id):
     """View a single post."""
-    post = Post.query.get_or_404(post_id)
-    return render_template('posts/view.html', title=post.title, post=post)
+    post = listing_query(Post, full=True).filter(Post.id == post_id).first_or_404()
+    validators, last_modified = listing_validators([post], 'author')
+    return render_conditional('posts/view.html', validators, last_modified,
+                              title=post.title, post=post)
 
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -29,9 +46,9 @@ def create_post():
     if form.validate_on_submit():
         post = Post(
             user_id=current_user.id,
-            title=form.title.data,
-            content=form.content.data
+            title=form.title.data
         )
+        post.set_content(form.content.data)
         db.session.add(post)
         db.session.commit()
         
@@ -54,8 +71,9 @@ def edit_post(post_id):
     form = PostForm()
     if form.validate_on_submit():
         post.title = form.title.data
-        post.content = form.content.data
+        post.set_content(form.content.data)
         db.session.commit()
+        fragment_cache().invalidate(f'post:{post.id}')
         
         flash('Your post has been updated!', 'success')
         return redirect(url_for('posts.view_post', post_id=post.id))
@@ -80,6 +98,7 @@ def delete_post(post_id):
     
     db.session.delete(post)
     db.session.commit()
+    fragment_cache().invalidate(f'post:{post_id}')
     
     flash('Post has been deleted.', 'info')
     return redirect(url_for('posts.list_posts'))
@@ -1,49 +1,42 @@
-import os
-from werkzeug.utils import secure_filename
-from PIL import Image
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, Gig, Post, Course
 from app.forms import ProfileEditForm, ChangePasswordForm
+from app.queries import deferred_options, query_budget
+from app.cache import fragment_cache
+from app.conditional import render_conditional, listing_validators
+from app.images import accept_avatar, schedule_avatar, delete_avatar
 
 bp = Blueprint('profile', __name__, url_prefix='/profile')
 
 
-def save_profile_picture(form_picture):
-    """Save and resize profile picture."""
-    # Generate unique filename
-    filename = secure_filename(form_picture.filename)
-    random_hex = os.urandom(8).hex()
-    _, f_ext = os.path.splitext(filename)
-    picture_fn = random_hex + f_ext
-    picture_path = os.path.join(current_app.config['UPLOAD_FOLDER'], picture_fn)
-    
-    # Resize image to 300x300
-    output_size = (300, 300)
-    img = Image.open(form_picture)
-    img.thumbnail(output_size)
-    img.save(picture_path)
-    
-    return picture_fn
-
-
 @bp.route('/<string:username>')
+@query_budget(5)
 def view_profile(username):
     """View a user's profile."""
     user = User.query.filter_by(username=username).first_or_404()
     
     # Get user's content
     gigs = Gig.query.filter_by(user_id=user.id).order_by(Gig.created_at.desc()).all()
-    posts = Post.query.filter_by(user_id=user.id).order_by(Post.created_at.desc()).all()
+    posts = Post.query.options(*deferred_options(Post)).filter_by(user_id=user.id).order_by(Post.created_at.desc()).all()
     courses = Course.query.filter_by(teacher_id=user.id).order_by(Course.created_at.desc()).all()
     
-    return render_template('profile/view.html',
-                         title=f'{user.username}\'s Profile',
-                         user=user,
-                         gigs=gigs,
-                         posts=posts,
-                         courses=courses)
+    user_modified = user.updated_at or user.created_at
+    validators = [(user.id, user.username, user_modified)]
+    timestamps = [user_modified]
+    for items, owner_attr in ((gigs, 'user'), (posts, 'author'), (courses, 'teacher')):
+        parts, last_modified = listing_validators(items, owner_attr)
+        validators.append(parts)
+        if last_modified is not None:
+            timestamps.append(last_modified)
+    
+    return render_conditional('profile/view.html', validators, max(timestamps),
+                              title=f'{user.username}\'s Profile',
+                              user=user,
+                              gigs=gigs,
+                              posts=posts,
+                              courses=courses)
 
 
 @bp.route('/edit', methods=['GET', 'POST'])
@@ -53,6 +46,7 @@ def edit_profile():
     form = ProfileEditForm(current_user.username, current_user.email)
     
     if form.validate_on_submit():
+        username_changed = current_user.username != form.username.data
         current_user.username = form.username.data
         current_user.email = form.email.data
         current_user.bio = form.bio.data
@@ -61,19 +55,25 @@ def edit_profile():
         if current_user.is_student():
             current_user.major = form.major.data
         
-        # Handle profile picture upload
+        # Handle profile picture upload; resizing happens in the background
+        new_picture = old_picture = None
         if form.profile_picture.data:
-            # Delete old picture if exists
-            if current_user.profile_picture:
-                old_picture_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 
-                                              current_user.profile_picture)
-                if os.path.exists(old_picture_path):
-                    os.remove(old_picture_path)
-            
-            picture_file = save_profile_picture(form.profile_picture.data)
-            current_user.profile_picture = picture_file
+            old_picture = current_user.profile_picture
+            new_picture, ready = accept_avatar(form.profile_picture.data)
+            current_user.profile_picture = new_picture
+            current_user.avatar_ready = ready
+            if ready:
+                new_picture = None
         
         db.session.commit()
+        if old_picture:
+            # Release the old picture's reference
+            delete_avatar(old_picture)
+        if new_picture:
+            schedule_avatar(current_user.id, new_picture)
+        if username_changed:
+            # Post fragments show the author's name
+            fragment_cache().invalidate(f'user:{current_user.id}')
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('profile.view_profile', username=current_user.username))
     
@@ -0,0 +1,30 @@
+from flask import Blueprint, render_template, request, current_app
+from app.search import DOCUMENTS, search as run_search
+from app.queries import query_budget
+
+bp = Blueprint('search', __name__, url_prefix='/search')
+
+
+@bp.route('/')
+@query_budget(6)
+def search():
+    """Ranked full-text search across posts, courses and gigs."""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type', '')
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        page = 1
+    
+    kinds = [kind] if kind in DOCUMENTS else None
+    results, has_next = [], False
+    if query:
+        results, has_next = run_search(query, kinds=kinds, page=page,
+                                       per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
+    
+    return render_template('search/results.html',
+                         title='Search',
+                         query=query,
+                         kind=kind if kinds else '',
+                         results=results,
+                         page=page,
+                         has_next=has_next)
@@ -0,0 +1,254 @@
+"""Full-text search over posts, courses and gigs.
+
+Documents live in a single ``search_index`` table whose row id encodes the
+content type and primary key (``ref_id * 4 + kind``), so keeping it in sync
+is a primary-key upsert or delete. SQLite uses an FTS5 virtual table ranked
+with bm25(); PostgreSQL uses a tsvector column with a GIN index ranked with
+ts_rank(). Both are driven through the same ``SearchBackend`` interface.
+"""
+import re
+from sqlalchemy import Integer, column, event, table, text
+from app import db
+from app.models import Post, Course, Gig
+
+
+# kind -> (code, model, title attribute, body attribute)
+DOCUMENTS = {
+    'post': (1, Post, 'title', 'content'),
+    'course': (2, Course, 'title', 'description'),
+    'gig': (3, Gig, 'subject', 'major'),
+}
+KIND_BY_CODE = {code: kind for kind, (code, *_) in DOCUMENTS.items()}
+KIND_BY_MODEL = {model: kind for kind, (_, model, *_) in DOCUMENTS.items()}
+
+
+def doc_id(kind, ref_id):
+    return ref_id * 4 + DOCUMENTS[kind][0]
+
+
+def split_doc_id(value):
+    return KIND_BY_CODE[value % 4], value // 4
+
+
+def tokenize(query):
+    """Reduce free text to plain word tokens safe to embed in a match query."""
+    return re.findall(r'\w+', query.lower())[:16]
+
+
+class SearchBackend:
+    """Interface implemented by each database's full-text index."""
+
+    def create_index(self, conn):
+        raise NotImplementedError
+
+    def drop_index(self, conn):
+        conn.execute(text('DROP TABLE IF EXISTS search_index'))
+
+    def upsert(self, conn, doc, title, body):
+        raise NotImplementedError
+
+    def delete(self, conn, doc):
+        conn.execute(text('DELETE FROM search_index WHERE {} = :doc'.format(self.key)),
+                     {'doc': doc})
+
+    def delete_many(self, conn, kind, ref_ids):
+        """Delete the ``kind`` documents whose primary keys ``ref_ids`` (a SELECT) returns."""
+        index = table('search_index', column(self.key, Integer))
+        ref_id = ref_ids.subquery().c[0]
+        docs = db.select(ref_id * 4 + DOCUMENTS[kind][0])
+        conn.execute(index.delete().where(index.c[self.key].in_(docs)))
+
+    def search(self, conn, terms, kinds, limit, offset):
+        """Return ``(doc_id, rank)`` rows, best match first."""
+        raise NotImplementedError
+
+    def matching_ids(self, kind, terms):
+        """Select the primary keys of ``kind`` documents matching ``terms``."""
+        raise NotImplementedError
+
+
+class SqliteBackend(SearchBackend):
+    """FTS5 virtual table with porter stemming, ranked by bm25()."""
+
+    key = 'rowid'
+
+    def create_index(self, conn):
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        ))
+
+    def upsert(self, conn, doc, title, body):
+        self.delete(conn, doc)
+        conn.execute(text('INSERT INTO search_index (rowid, title, body) VALUES (:doc, :title, :body)'),
+                     {'doc': doc, 'title': title, 'body': body})
+
+    @staticmethod
+    def _match(terms):
+        return ' '.join('"{}"*'.format(term) for term in terms)
+
+    def search(self, conn, terms, kinds, limit, offset):
+        codes = ', '.join(str(DOCUMENTS[kind][0]) for kind in kinds)
+        return conn.execute(text(
+            'SELECT rowid, bm25(search_index, 4.0, 1.0) AS rank FROM search_index '
+            'WHERE search_index MATCH :q AND rowid % 4 IN ({}) '
+            'ORDER BY rank, rowid LIMIT :limit OFFSET :offset'.format(codes)
+        ), {'q': self._match(terms), 'limit': limit, 'offset': offset}).all()
+
+    def matching_ids(self, kind, terms):
+        return text(
+            'SELECT rowid / 4 AS ref_id FROM search_index '
+            'WHERE search_index MATCH :q AND rowid % 4 = :code'
+        ).bindparams(q=self._match(terms), code=DOCUMENTS[kind][0]).columns(column('ref_id', Integer))
+
+
+class PostgresBackend(SearchBackend):
+    """Weighted tsvector column behind a GIN index, ranked by ts_rank()."""
+
+    key = 'doc_id'
+    document = ("setweight(to_tsvector('english', :title), 'A') || "
+                "setweight(to_tsvector('english', :body), 'B')")
+
+    def create_index(self, conn):
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS search_index ('
+            'doc_id BIGINT PRIMARY KEY, document TSVECTOR NOT NULL)'
+        ))
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_search_index_document '
+            'ON search_index USING GIN (document)'
+        ))
+
+    def upsert(self, conn, doc, title, body):
+        conn.execute(text(
+            'INSERT INTO search_index (doc_id, document) VALUES (:doc, {}) '
+            'ON CONFLICT (doc_id) DO UPDATE SET document = EXCLUDED.document'.format(self.document)
+        ), {'doc': doc, 'title': title, 'body': body})
+
+    @staticmethod
+    def _match(terms):
+        return ' & '.join('{}:*'.format(term) for term in terms)
+
+    def search(self, conn, terms, kinds, limit, offset):
+        codes = ', '.join(str(DOCUMENTS[kind][0]) for kind in kinds)
+        return conn.execute(text(
+            "SELECT doc_id, ts_rank(document, query) AS rank "
+            "FROM search_index, to_tsquery('english', :q) AS query "
+            "WHERE document @@ query AND doc_id % 4 IN ({}) "
+            "ORDER BY rank DESC, doc_id LIMIT :limit OFFSET :offset".format(codes)
+        ), {'q': self._match(terms), 'limit': limit, 'offset': offset}).all()
+
+    def matching_ids(self, kind, terms):
+        return text(
+            "SELECT doc_id / 4 AS ref_id FROM search_index "
+            "WHERE document @@ to_tsquery('english', :q) AND doc_id % 4 = :code"
+        ).bindparams(q=self._match(terms), code=DOCUMENTS[kind][0]).columns(column('ref_id', Integer))
+
+
+BACKENDS = {
+    'sqlite': SqliteBackend(),
+    'postgresql': PostgresBackend(),
+}
+
+
+def get_backend(dialect_name=None):
+    """Return the backend for ``dialect_name`` (default: the app's engine)."""
+    if dialect_name is None:
+        dialect_name = db.engine.dialect.name
+    try:
+        return BACKENDS[dialect_name]
+    except KeyError:
+        raise RuntimeError(f'Full-text search is not supported on {dialect_name}')
+
+
+def _document_fields(kind, obj):
+    _, _, title_attr, body_attr = DOCUMENTS[kind]
+    return getattr(obj, title_attr) or '', getattr(obj, body_attr) or ''
+
+
+class SearchResult:
+    """A matched object together with its kind and relevance rank."""
+
+    def __init__(self, kind, obj, rank):
+        self.kind = kind
+        self.obj = obj
+        self.rank = rank
+
+
+def search(query, kinds=None, page=1, per_page=20):
+    """Run a ranked search and return ``(results, has_next)``.
+
+    Matched rows are loaded with one listing query per kind on the page.
+    """
+    from app.queries import listing_query
+
+    terms = tokenize(query)
+    if not terms:
+        return [], False
+    kinds = kinds or list(DOCUMENTS)
+    rows = get_backend().search(db.session.connection(), terms, kinds,
+                                limit=per_page + 1, offset=(page - 1) * per_page)
+    has_next = len(rows) > per_page
+    hits = [(split_doc_id(doc), rank) for doc, rank in rows[:per_page]]
+
+    objects = {}
+    for kind in {kind for (kind, _), _ in hits}:
+        model = DOCUMENTS[kind][1]
+        ids = [ref_id for (k, ref_id), _ in hits if k == kind]
+        for obj in listing_query(model).filter(model.id.in_(ids)):
+            objects[kind, obj.id] = obj
+
+    results = [SearchResult(kind, objects[kind, ref_id], rank)
+               for (kind, ref_id), rank in hits if (kind, ref_id) in objects]
+    return results, has_next
+
+
+def matching_ids(kind, query):
+    """Subquery of ``kind`` ids matching ``query``, or None for an empty query."""
+    terms = tokenize(query)
+    if not terms:
+        return None
+    return get_backend().matching_ids(kind, terms)
+
+
+def rebuild_index():
+    """Recreate the index from scratch and return the number of documents."""
+    backend = get_backend()
+    conn = db.session.connection()
+    backend.drop_index(conn)
+    backend.create_index(conn)
+    count = 0
+    for kind, (_, model, _, _) in DOCUMENTS.items():
+        for obj in model.query.yield_per(500):
+            backend.upsert(conn, doc_id(kind, obj.id), *_document_fields(kind, obj))
+            count += 1
+    db.session.commit()
+    return count
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_index(session, flush_context):
+    """Mirror flushed content changes into the index in the same transaction."""
+    changes = []
+    for obj in session.new:
+        kind = KIND_BY_MODEL.get(type(obj))
+        if kind:
+            changes.append((kind, obj, False))
+    for obj in session.dirty:
+        kind = KIND_BY_MODEL.get(type(obj))
+        if kind and session.is_modified(obj, include_collections=False):
+            changes.append((kind, obj, False))
+    for obj in session.deleted:
+        kind = KIND_BY_MODEL.get(type(obj))
+        if kind:
+            changes.append((kind, obj, True))
+    if not changes:
+        return
+
+    conn = session.connection()
+    backend = get_backend(conn.dialect.name)
+    for kind, obj, deleted in changes:
+        if deleted:
+            backend.delete(conn, doc_id(kind, obj.id))
+        else:
+            backend.upsert(conn, doc_id(kind, obj.id), *_document_fields(kind, obj))
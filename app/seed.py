@@ -0,0 +1,151 @@
+"""Reproducible synthetic data for benchmarking.
+
+``seed(...)`` bulk-inserts users, gigs, posts and courses with Core
+executemany statements in batches, driven by a seeded ``random.Random`` so
+the same arguments always produce the same dataset. Derived data that the
+ORM listeners normally maintain (gig slots, search index, dashboard
+statistics) is rebuilt once at the end.
+"""
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from app import availability, db, excerpts
+from app.models import User, Gig, GigSlot, Post, Course
+from app.search import rebuild_index
+from app.stats import reconcile
+
+USERNAME_PREFIX = 'seed_'
+PASSWORD = 'password'
+BATCH_SIZE = 5000
+
+MAJORS = ['Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Economics',
+          'Psychology', 'History', 'Mechanical Engineering', 'Electrical Engineering',
+          'Philosophy', 'Literature', 'Statistics', 'Architecture', 'Medicine']
+SUBJECTS = ['Calculus', 'Linear Algebra', 'Data Structures', 'Algorithms', 'Organic Chemistry',
+            'Thermodynamics', 'Microeconomics', 'Statistics', 'Genetics', 'Operating Systems',
+            'Databases', 'Quantum Mechanics', 'Discrete Math', 'Machine Learning', 'Anatomy',
+            'Macroeconomics', 'Signals and Systems', 'Ethics', 'World History', 'Compilers']
+WORDS = ('study exam notes lecture project review homework deadline group library semester '
+         'tips question answer problem solution theory practice lab report research paper '
+         'chapter summary guide week midterm final quiz formula proof example concept').split()
+AVAILABILITY = ['Mon-Wed 2pm-5pm', 'weekdays 18-21', 'Sat 10-12; Sun 14-18', 'Tue/Thu 9-11',
+                'weekends 10am-4pm', 'Mon 8-10; Wed 8-10; Fri 13-15', 'daily 20-22',
+                'Thu-Fri 12-14', 'Mon-Fri 16:00-18:30', 'Sun 9-13']
+
+
+def _sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize()
+
+
+def _paragraphs(rng, count):
+    return '\n\n'.join('. '.join(_sentence(rng, 6, 16) for _ in range(rng.randint(3, 6))) + '.'
+                       for _ in range(count))
+
+
+def _created(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def _new_ids(conn, model, after):
+    return conn.execute(db.select(model.id).where(model.id > after).order_by(model.id)).scalars().all()
+
+
+def _max_id(conn, model):
+    return conn.execute(db.select(db.func.coalesce(db.func.max(model.id), 0))).scalar()
+
+
+def already_seeded():
+    return db.session.query(User.query.filter(User.username.like(USERNAME_PREFIX + '%')).exists()).scalar()
+
+
+def seed(users=1000, posts=10000, gigs=2000, courses=500, seed=42, days=365, echo=None):
+    """Insert a synthetic dataset; return counts per table.
+
+    Every user's password is ``PASSWORD``; ``<prefix>admin`` is an admin.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    echo = echo or (lambda message: None)
+    conn = db.session.connection()
+    password_hash = generate_password_hash(PASSWORD)
+
+    first_user = _max_id(conn, User)
+    teacher_share = 0.1
+    user_rows = [{
+        'username': f'{USERNAME_PREFIX}admin', 'email': f'{USERNAME_PREFIX}admin@example.com',
+        'password_hash': password_hash, 'role': 'admin', 'avatar_ready': True,
+        'created_at': now - timedelta(days=days), 'updated_at': now - timedelta(days=days),
+    }]
+    for i in range(users - 1):
+        role = 'teacher' if rng.random() < teacher_share else 'student'
+        created = _created(rng, now, days)
+        user_rows.append({
+            'username': f'{USERNAME_PREFIX}{i}', 'email': f'{USERNAME_PREFIX}{i}@example.com',
+            'password_hash': password_hash, 'role': role,
+            'major': rng.choice(MAJORS) if role == 'student' else None,
+            'bio': _sentence(rng, 5, 20) if rng.random() < 0.6 else None,
+            'avatar_ready': True, 'created_at': created, 'updated_at': created,
+        })
+    _insert(conn, User.__table__, user_rows)
+    user_ids = _new_ids(conn, User, first_user)
+    students = [uid for uid, row in zip(user_ids, user_rows) if row['role'] == 'student']
+    teachers = [uid for uid, row in zip(user_ids, user_rows) if row['role'] != 'student'] or user_ids
+    majors = {uid: row.get('major') for uid, row in zip(user_ids, user_rows)}
+    echo(f'users: {len(user_ids)}')
+
+    # a few prolific authors, a long tail of occasional ones
+    authors = rng.choices(user_ids, weights=[1 / (rank + 1) for rank in range(len(user_ids))], k=posts)
+    post_rows = []
+    for author in authors:
+        created = _created(rng, now, days)
+        content = _paragraphs(rng, rng.randint(1, 6))
+        post_rows.append({
+            'user_id': author, 'title': _sentence(rng, 3, 9),
+            'content': content, **excerpts.summarize(content),
+            'created_at': created, 'updated_at': created,
+        })
+    _insert(conn, Post.__table__, post_rows)
+    echo(f'posts: {len(post_rows)}')
+
+    first_gig = _max_id(conn, Gig)
+    gig_rows = []
+    for _ in range(gigs):
+        owner = rng.choice(students or user_ids)
+        text = rng.choice(AVAILABILITY)
+        created = _created(rng, now, days)
+        gig_rows.append({
+            'user_id': owner, 'major': majors.get(owner) or rng.choice(MAJORS),
+            'subject': rng.choice(SUBJECTS), 'available_hours': text,
+            'availability': availability.to_bytes(availability.parse_availability(text)),
+            'created_at': created, 'updated_at': created,
+        })
+    _insert(conn, Gig.__table__, gig_rows)
+    slot_rows = [{'gig_id': gig_id, 'slot': slot}
+                 for gig_id, row in zip(_new_ids(conn, Gig, first_gig), gig_rows)
+                 for slot in availability.iter_slots(availability.from_bytes(row['availability']))]
+    _insert(conn, GigSlot.__table__, slot_rows)
+    echo(f'gigs: {len(gig_rows)} ({len(slot_rows)} slots)')
+
+    course_rows = []
+    for i in range(courses):
+        created = _created(rng, now, days)
+        course_rows.append({
+            'teacher_id': rng.choice(teachers),
+            'title': f'{rng.choice(SUBJECTS)} {rng.choice(["I", "II", "Fundamentals", "Workshop", "Lab"])}',
+            'description': _paragraphs(rng, 1), 'link': f'https://courses.example.com/{seed}/{i}',
+            'created_at': created, 'updated_at': created,
+        })
+    _insert(conn, Course.__table__, course_rows)
+    echo(f'courses: {len(course_rows)}')
+    db.session.commit()
+
+    echo('rebuilding search index and statistics...')
+    rebuild_index()
+    reconcile()
+    return {'users': len(user_ids), 'posts': len(post_rows), 'gigs': len(gig_rows), 'courses': len(course_rows)}
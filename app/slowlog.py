@@ -0,0 +1,188 @@
+"""Opt-in slow-query recorder.
+
+With ``SLOW_QUERY_ENABLED`` every engine gets cursor-event listeners that time
+every statement. Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are
+recorded with their normalised SQL, bind parameters, the endpoint that ran
+them, the engine they ran on (``primary`` or a replica's bind key) and, for ``SELECT``s, the query plan: ``EXPLAIN QUERY PLAN`` on SQLite,
+``EXPLAIN`` on PostgreSQL, or ``EXPLAIN ANALYZE`` for a
+``SLOW_QUERY_ANALYZE_RATE`` fraction of them (it runs the query again).
+Plans are fetched on the raw DBAPI cursor so they don't re-enter the
+listeners, inside a savepoint on PostgreSQL so a failed ``EXPLAIN`` can't
+abort the request's transaction.
+
+Entries go to a per-process ring buffer of ``SLOW_QUERY_BUFFER`` entries
+and, when ``SLOW_QUERY_LOG_FILE`` is set, are appended to that JSON-lines
+file so every worker's entries can be seen in one place and dumped with
+``flask slowlog dump``.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from app import db
+
+MAX_PARAM_LENGTH = 200
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:\?|%\([^)]*\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s|:\w+))+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+_EXPLAINABLE_RE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+
+def normalize(statement):
+    """Collapse whitespace, literals and placeholder lists so similar statements match."""
+    text = _STRING_RE.sub('?', statement)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_LIST_RE.sub('(...)', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def _short(value):
+    text = repr(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '...'
+
+
+def _format_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_short(value) for value in parameters]
+    return _short(parameters)
+
+
+def explain(connection, statement, parameters, analyze=False):
+    """Return the plan of ``statement`` as a list of lines."""
+    dialect = connection.dialect.name
+    cursor = connection.connection.cursor()
+    try:
+        if dialect == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            # rows are (id, parent, notused, detail); indent by nesting depth
+            depth = {0: -1}
+            lines = []
+            for node, parent, _, detail in cursor.fetchall():
+                depth[node] = depth.get(parent, -1) + 1
+                lines.append('  ' * depth[node] + detail)
+            return lines
+        if dialect == 'postgresql':
+            cursor.execute('SAVEPOINT slowlog_explain')
+            try:
+                prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+                cursor.execute(prefix + statement, parameters)
+                lines = [row[0] for row in cursor.fetchall()]
+            except Exception:
+                cursor.execute('ROLLBACK TO SAVEPOINT slowlog_explain')
+                raise
+            cursor.execute('RELEASE SAVEPOINT slowlog_explain')
+            return lines
+        return []
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms=100, size=200, analyze_rate=0.0, path=None):
+        self.threshold = threshold_ms / 1000
+        self.analyze_rate = analyze_rate
+        self.path = path
+        self.entries = deque(maxlen=size)
+        self._binds = {}  # engine -> bind name
+        self._lock = threading.Lock()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slowlog_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('slowlog_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed >= self.threshold:
+            self.record(conn, statement, parameters, elapsed, executemany)
+
+    def _error(self, context):
+        starts = context.connection.info.get('slowlog_start') if context.connection else None
+        if starts:
+            starts.pop()
+
+    def record(self, conn, statement, parameters, elapsed, executemany=False):
+        plan, analyzed = None, False
+        explainable = not executemany and _EXPLAINABLE_RE.match(statement)
+        if explainable:
+            # ANALYZE runs the query again, so only for plain SELECTs
+            analyzed = (conn.dialect.name == 'postgresql' and explainable.group(1).upper() == 'SELECT'
+                        and random.random() < self.analyze_rate)
+            try:
+                plan = explain(conn, statement, parameters, analyze=analyzed)
+            except Exception as e:
+                plan, analyzed = [f'EXPLAIN failed: {e}'], False
+
+        entry = {
+            'at': datetime.utcnow().isoformat(timespec='seconds'),
+            'duration_ms': round(elapsed * 1000, 2),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'bind': self._binds.get(conn.engine, 'primary'),
+            'statement': normalize(statement),
+            'parameters': None if executemany else _format_parameters(parameters),
+            'plan': plan,
+            'analyzed': analyzed,
+            'pid': os.getpid(),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    def recent(self, limit=None):
+        """Newest entries first; from the shared file when there is one."""
+        limit = limit or self.entries.maxlen
+        if self.path:
+            return read_file(self.path, limit)
+        with self._lock:
+            return list(reversed(self.entries))[:limit]
+
+    def attach(self, engine, bind='primary'):
+        self._binds[engine] = bind
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+        event.listen(engine, 'handle_error', self._error)
+
+
+def read_file(path, limit):
+    """The last ``limit`` entries of a slow-query file, newest first."""
+    try:
+        with open(path) as f:
+            lines = deque(f, maxlen=limit)
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def get_log():
+    return current_app.extensions.get('slow_query_log')
+
+
+def init_app(app):
+    if not app.config['SLOW_QUERY_ENABLED']:
+        return
+    log = SlowQueryLog(app.config['SLOW_QUERY_THRESHOLD_MS'], app.config['SLOW_QUERY_BUFFER'],
+                       app.config['SLOW_QUERY_ANALYZE_RATE'], app.config['SLOW_QUERY_LOG_FILE'])
+    with app.app_context():
+        # the primary is the None bind; replicas (app/replicas.py) are named ones
+        for bind, engine in db.engines.items():
+            log.attach(engine, bind or 'primary')
+    app.extensions['slow_query_log'] = log
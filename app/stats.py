@@ -0,0 +1,138 @@
+"""Incrementally maintained content statistics.
+
+A flush listener turns inserted and deleted ``User``/``Gig``/``Post``/
+``Course`` rows into ``UPDATE ... SET n = n + :delta`` statements on the
+single ``site_statistics`` row, plus upserts into per-day creation buckets
+(a deleted row leaves the bucket of the day it was created), all inside the
+flushing transaction. Relative updates keep concurrent
+workers from overwriting each other. ``reconcile()`` recomputes everything
+exactly from the content tables.
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import User, Gig, Post, Course, SiteStatistics, DailyStatistics
+
+COUNTED = {
+    User: 'users',
+    Gig: 'gigs',
+    Post: 'posts',
+    Course: 'courses',
+}
+STATS_ROW_ID = 1
+
+_upsert = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def exact_totals(conn):
+    return {column: conn.execute(db.select(func.count()).select_from(model.__table__)).scalar()
+            for model, column in COUNTED.items()}
+
+
+def apply_changes(conn, totals, daily=None):
+    """Add ``totals`` (column -> delta) and ``daily`` (day -> column -> count).
+
+    Bulk code paths that bypass the ORM call this directly.
+    """
+    totals = {column: delta for column, delta in totals.items() if delta}
+    table = SiteStatistics.__table__
+    if totals:
+        result = conn.execute(
+            table.update()
+            .where(table.c.id == STATS_ROW_ID)
+            .values(updated_at=datetime.utcnow(),
+                    **{column: table.c[column] + delta for column, delta in totals.items()})
+        )
+        if result.rowcount == 0:
+            # first write on a fresh database: start from exact counts,
+            # which already include the rows being flushed
+            conn.execute(table.insert().values(id=STATS_ROW_ID, updated_at=datetime.utcnow(),
+                                               **exact_totals(conn)))
+
+    if daily:
+        # every bucket in one multi-row upsert, however many days a bulk change spans
+        columns = sorted({column for counts in daily.values() for column in counts})
+        daily_table = DailyStatistics.__table__
+        stmt = _upsert[conn.dialect.name](daily_table).values(
+            [{'day': day, **{column: counts.get(column, 0) for column in columns}}
+             for day, counts in daily.items()])
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['day'],
+            set_={column: daily_table.c[column] + stmt.excluded[column] for column in columns},
+        ))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _load_deleted_dates(session, flush_context, instances):
+    """Make sure deleted rows' creation dates are loaded while the rows exist."""
+    for obj in session.deleted:
+        if type(obj) in COUNTED:
+            obj.created_at
+
+
+@event.listens_for(db.session, 'after_flush')
+def _count_changes(session, flush_context):
+    totals = Counter()
+    daily = defaultdict(Counter)
+    for obj in session.new:
+        column = COUNTED.get(type(obj))
+        if column:
+            totals[column] += 1
+            daily[as_date(obj.created_at) or datetime.utcnow().date()][column] += 1
+    for obj in session.deleted:
+        column = COUNTED.get(type(obj))
+        if column:
+            totals[column] -= 1
+            daily[as_date(obj.created_at)][column] -= 1
+    if totals:
+        apply_changes(session.connection(), totals, daily)
+
+
+def get_statistics():
+    """Return the totals row, creating it on first use."""
+    stats = db.session.get(SiteStatistics, STATS_ROW_ID)
+    if stats is None:
+        reconcile()
+        stats = db.session.get(SiteStatistics, STATS_ROW_ID)
+    return stats
+
+
+def recent_days(days=14):
+    """Most recent daily buckets, oldest first."""
+    rows = DailyStatistics.query.order_by(DailyStatistics.day.desc()).limit(days).all()
+    return list(reversed(rows))
+
+
+def reconcile():
+    """Recompute totals and daily buckets exactly; return the totals."""
+    conn = db.session.connection()
+    totals = exact_totals(conn)
+    table = SiteStatistics.__table__
+    conn.execute(table.delete())
+    conn.execute(table.insert().values(id=STATS_ROW_ID, updated_at=datetime.utcnow(), **totals))
+
+    daily = defaultdict(dict)
+    for model, column in COUNTED.items():
+        day = func.date(model.created_at)
+        for value, count in conn.execute(db.select(day, func.count()).group_by(day)):
+            daily[as_date(value)][column] = count
+    conn.execute(DailyStatistics.__table__.delete())
+    if daily:
+        conn.execute(DailyStatistics.__table__.insert(),
+                     [{'day': day, **{c: counts.get(c, 0) for c in COUNTED.values()}}
+                      for day, counts in daily.items()])
+    db.session.commit()
+    return totals
@@ -0,0 +1,212 @@
+"""Content-addressed file storage.
+
+Uploads are streamed to a temporary file in fixed-size chunks while being
+hashed, so no upload is ever held in memory. The SHA-256 digest names the
+stored blob; identical uploads share one blob, tracked by a reference count
+in ``stored_files``. Blobs go to a pluggable backend: the local upload
+folder or any S3-compatible object store (AWS, MinIO, ...).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from flask import current_app, url_for
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import StoredFile
+
+CHUNK_SIZE = 64 * 1024
+
+_upsert = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+class StorageBackend:
+    """Where blobs live. Keys are flat names such as ``<sha256>.orig``."""
+
+    def put(self, key, fileobj, content_type=None):
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a readable, seekable binary file for ``key``."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Blobs in a local directory, served as static files."""
+
+    def __init__(self, root, url_prefix=None):
+        self.root = root
+        self.url_prefix = url_prefix
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, os.path.basename(key))
+
+    def put(self, key, fileobj, content_type=None):
+        # write then rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+        os.replace(tmp, self._path(key))
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def url(self, key):
+        if self.url_prefix:
+            return f'{self.url_prefix.rstrip("/")}/{key}'
+        return url_for('static', filename='uploads/' + key)
+
+
+class S3Storage(StorageBackend):
+    """Blobs in an S3-compatible bucket.
+
+    ``endpoint_url`` points the client at a non-AWS service such as a local
+    MinIO container. Credentials come from the usual AWS environment
+    variables. Content-addressed keys never change, so objects are uploaded
+    with a far-future immutable Cache-Control.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, public_url=None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError('STORAGE_BACKEND=s3 requires boto3 (pip install boto3)')
+        self.bucket = bucket
+        self.public_url = public_url or f'{endpoint_url or "https://s3.amazonaws.com"}/{bucket}'
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def put(self, key, fileobj, content_type=None):
+        extra = {'CacheControl': 'public, max-age=31536000, immutable'}
+        if content_type:
+            extra['ContentType'] = content_type
+        # upload_fileobj streams in multipart chunks
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+
+    def open(self, key):
+        spool = tempfile.TemporaryFile()
+        self.client.download_fileobj(self.bucket, key, spool)
+        spool.seek(0)
+        return spool
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def url(self, key):
+        return f'{self.public_url.rstrip("/")}/{key}'
+
+
+def get_backend():
+    return current_app.extensions['storage']
+
+
+def spool_upload(stream):
+    """Copy ``stream`` to a temporary file in chunks, hashing as it goes.
+
+    Returns ``(digest, size, temp_file)``; the temp file is rewound and
+    deleted when closed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    spool = tempfile.TemporaryFile()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        spool.write(chunk)
+        size += len(chunk)
+    spool.seek(0)
+    return digest.hexdigest(), size, spool
+
+
+def store_upload(upload, suffix=''):
+    """Store an uploaded file once per distinct content.
+
+    Adds a reference to the blob in the current transaction and returns
+    ``(digest, created)``. The blob is written when this reference created
+    the row, or when the backend lacks it; ``created`` means no earlier
+    upload's derived files (e.g. avatar variants) can be relied on.
+    """
+    digest, size, spool = spool_upload(upload.stream)
+    with spool:
+        created = acquire(digest, size, upload.mimetype) == 1
+        backend = get_backend()
+        key = digest + suffix
+        if created or not backend.exists(key):
+            backend.put(key, spool, upload.mimetype)
+    return digest, created
+
+
+def acquire(digest, size=0, content_type=None):
+    """Add a reference to ``digest``, creating its row on first use; return the new count."""
+    conn = db.session.connection()
+    table = StoredFile.__table__
+    stmt = _upsert[conn.dialect.name](table).values(
+        digest=digest, size=size, content_type=content_type, refcount=1)
+    return conn.execute(stmt.on_conflict_do_update(
+        index_elements=['digest'], set_={'refcount': table.c.refcount + 1})
+        .returning(table.c.refcount)).scalar_one()
+
+
+def release(digest, keys):
+    """Drop a reference to ``digest``; delete ``keys`` once nothing uses it.
+
+    Commits, so call it after the change that dropped the reference. The
+    files are removed before the commit, while the row delete still holds
+    its lock, so a concurrent upload of the same content waits in
+    ``acquire`` and then writes the blob afresh.
+    """
+    table = StoredFile.__table__
+    db.session.execute(table.update().where(table.c.digest == digest)
+                       .values(refcount=table.c.refcount - 1))
+    deleted = db.session.execute(table.delete().where(table.c.digest == digest)
+                                 .where(table.c.refcount <= 0)).rowcount
+    if deleted:
+        backend = get_backend()
+        for key in keys:
+            backend.delete(key)
+    db.session.commit()
+    return bool(deleted)
+
+
+def init_app(app):
+    if app.config['STORAGE_BACKEND'] == 's3':
+        backend = S3Storage(app.config['S3_BUCKET'],
+                            endpoint_url=app.config['S3_ENDPOINT_URL'],
+                            region=app.config['S3_REGION'],
+                            public_url=app.config['S3_PUBLIC_URL'])
+    else:
+        backend = LocalStorage(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_URL'])
+    app.extensions['storage'] = backend
@@ -0,0 +1,81 @@
+"""Deleting users with a fixed number of statements.
+
+The database removes a user's gigs, posts and courses (and the gigs' slots)
+through ``ON DELETE CASCADE``, so nothing is loaded into the session. Rows
+removed that way never pass through the session listeners, so the data
+they maintain is updated here:
+- dashboard totals and daily buckets, from counts taken before the delete;
+- the search index, with one ``DELETE ... IN (SELECT ...)`` per kind;
+- the identity cache, the match index and cached post fragments, after
+  the commit.
+
+The users' pictures are released in the avatar pool.
+"""
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import func, literal, union_all
+from sqlalchemy.orm.util import identity_key
+from app import db, stats
+from app.cache import fragment_cache
+from app.identity import invalidate_user
+from app.images import schedule_avatar_release
+from app.models import User, Gig, Post, Course
+from app.search import DOCUMENTS, get_backend
+
+# stats column -> owner column
+OWNED = {
+    'gigs': Gig.user_id,
+    'posts': Post.user_id,
+    'courses': Course.teacher_id,
+}
+OWNER_BY_MODEL = {column.class_: column for column in OWNED.values()}
+
+
+def _counts_by_day(conn, user_ids):
+    """``(stats column, creation day, count)`` of every row about to go, in one statement."""
+    selects = []
+    for name, column in {'users': User.id, **OWNED}.items():
+        day = func.date(column.class_.created_at)
+        selects.append(db.select(literal(name), day, func.count())
+                       .where(column.in_(user_ids)).group_by(day))
+    return conn.execute(union_all(*selects)).all()
+
+
+def delete_users(user_ids):
+    """Delete users and everything they own; return counts per table.
+
+    Commits.
+    """
+    user_ids = list(user_ids)
+    conn = db.session.connection()
+    owned = dict.fromkeys(OWNED, 0)
+    daily = defaultdict(Counter)
+    for name, day, count in _counts_by_day(conn, user_ids):
+        if name in owned:
+            owned[name] += count
+        daily[stats.as_date(day)][name] -= count
+    pictures = conn.execute(db.select(User.profile_picture)
+                            .where(User.id.in_(user_ids), User.profile_picture.isnot(None))).scalars().all()
+
+    backend = get_backend(conn.dialect.name)
+    for kind, (_, model, _, _) in DOCUMENTS.items():
+        backend.delete_many(conn, kind, db.select(model.id).where(OWNER_BY_MODEL[model].in_(user_ids)))
+
+    for user_id in user_ids:
+        user = db.session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            db.session.expunge(user)
+    users = User.__table__
+    deleted = db.session.execute(users.delete().where(users.c.id.in_(user_ids))).rowcount
+    stats.apply_changes(conn, {'users': -deleted, **{name: -count for name, count in owned.items()}},
+                        daily)
+    db.session.commit()
+
+    for user_id in user_ids:
+        invalidate_user(user_id)
+        fragment_cache().invalidate(f'user:{user_id}')
+    if 'match_index' in current_app.extensions:
+        current_app.extensions['match_index'].mark_stale(user_ids)
+    for picture in pictures:
+        schedule_avatar_release(picture)
+    return {'users': deleted, **owned}
@@ -0,0 +1,266 @@
+"""Bulk user import from a registrar CSV.
+
+The file is read as a stream and handled in batches: one query finds which
+usernames and emails of a batch already exist, passwords are hashed on a
+process pool, and new rows go in with a single executemany ``INSERT``
+(batched into multi-row ``VALUES`` by SQLAlchemy) followed by one commit
+per batch. Core statements bypass the session listeners, so dashboard
+statistics are updated explicitly.
+
+Columns: ``username``, ``email``, ``role`` (student/teacher, default
+student), ``major``, ``bio`` and ``password``. New accounts without a
+password get a generated one, reported through ``on_generated``. Updates
+only touch the columns a row fills in, and never touch admins.
+"""
+import csv
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from email_validator import EmailNotValidError, validate_email
+from flask import current_app
+from sqlalchemy import bindparam, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app import db, stats
+from app.identity import invalidate_user
+from app.models import User
+
+ROLES = ('student', 'teacher')
+MIN_PASSWORD_LENGTH = 6
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = []  # (line, reason)
+
+    def __repr__(self):
+        return (f'<ImportResult rows={self.rows} created={self.created} '
+                f'updated={self.updated} skipped={len(self.skipped)}>')
+
+
+def clean_row(row):
+    """Validate one CSV row; raise ValueError with a reason if it's unusable."""
+    username = (row.get('username') or '').strip()
+    if not 3 <= len(username) <= 80:
+        raise ValueError('username must be between 3 and 80 characters')
+    try:
+        email = validate_email((row.get('email') or '').strip(), check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(f'invalid email: {e}')
+    role = (row.get('role') or '').strip().lower() or None
+    if role is not None and role not in ROLES:
+        raise ValueError(f'role must be one of {", ".join(ROLES)}')
+    major = (row.get('major') or '').strip() or None
+    if major and len(major) > 100:
+        raise ValueError('major is longer than 100 characters')
+    password = row.get('password') or None
+    if password is not None and len(password) < MIN_PASSWORD_LENGTH:
+        raise ValueError(f'password is shorter than {MIN_PASSWORD_LENGTH} characters')
+    return {
+        'username': username,
+        'email': email,
+        'role': role,
+        'major': major if role != 'teacher' else None,
+        'bio': (row.get('bio') or '').strip() or None,
+        'password': password,
+    }
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _existing(batch):
+    """Ids of existing users by username and ``(id, role)`` by email, in one query."""
+    names = [data['username'] for _, data in batch]
+    emails = [data['email'] for _, data in batch]
+    rows = db.session.execute(
+        db.select(User.id, User.username, User.email, User.role)
+        .where(or_(User.username.in_(names), User.email.in_(emails)))
+    ).all()
+    return {r.username: r.id for r in rows}, {r.email: (r.id, r.role) for r in rows}
+
+
+def _changes(data, role):
+    """Columns an upsert sets on a user whose current role is ``role``.
+
+    Only what the row fills in; a teacher has no major.
+    """
+    changes = {}
+    if data['role'] is not None:
+        changes['role'] = role = data['role']
+    if role != 'student':
+        if 'role' in changes:
+            changes['major'] = None
+    elif data['major'] is not None:
+        changes['major'] = data['major']
+    if data['bio'] is not None:
+        changes['bio'] = data['bio']
+    return changes
+
+
+def _classify(batch, upsert, result):
+    """Split a batch into rows to insert and (user id, row) pairs to update."""
+    by_name, by_email = _existing(batch)
+    inserts, updates = [], []
+    for line, data in batch:
+        name_owner = by_name.get(data['username'])
+        email_owner, role = by_email.get(data['email'], (None, None))
+        if name_owner is None and email_owner is None:
+            inserts.append((line, data))
+        elif upsert and email_owner is not None and name_owner in (None, email_owner):
+            data['changes'] = _changes(data, role)
+            if role == 'admin':
+                result.skipped.append((line, 'existing admin account, not changed by imports'))
+            elif not data['changes'] and data['password'] is None:
+                result.skipped.append((line, 'nothing to update'))
+            else:
+                updates.append((email_owner, line, data))
+        elif email_owner is not None:
+            result.skipped.append((line, 'email already registered'))
+        else:
+            result.skipped.append((line, 'username already taken'))
+    return inserts, updates
+
+
+def _with_passwords(inserts, generate, result):
+    """Give new accounts without a password a generated one, or skip them."""
+    kept = []
+    for line, data in inserts:
+        if data['password'] is None:
+            if not generate:
+                result.skipped.append((line, 'no password (use --passwords-out to generate)'))
+                continue
+            data['password'] = secrets.token_urlsafe(12)
+            data['generated'] = True
+        kept.append((line, data))
+    return kept
+
+
+def _write(inserts, updates, hashes):
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    table = User.__table__
+    if inserts:
+        conn.execute(table.insert(), [
+            {'username': d['username'], 'email': d['email'], 'role': d['role'] or 'student',
+             'major': d['major'], 'bio': d['bio'], 'password_hash': hashes[line],
+             'avatar_ready': True, 'created_at': now, 'updated_at': now}
+            for line, d in inserts
+        ])
+        stats.apply_changes(conn, {'users': len(inserts)}, {now.date(): {'users': len(inserts)}})
+    # one executemany per set of columns being changed
+    groups = {}
+    for user_id, line, d in updates:
+        values = dict(d['changes'], updated_at=now)
+        if d['password'] is not None:
+            values['password_hash'] = hashes[line]
+        groups.setdefault(tuple(sorted(values)), []).append(
+            {'b_id': user_id, **{f'b_{name}': value for name, value in values.items()}})
+    for columns, rows in groups.items():
+        conn.execute(
+            table.update().where(table.c.id == bindparam('b_id'))
+            .values(**{name: bindparam(f'b_{name}') for name in columns}),
+            rows,
+        )
+
+
+def _hashing_context():
+    # fork() copies a process that already runs threads (avatar pool,
+    # profiler, metrics) and can deadlock the child
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def import_users(stream, upsert=False, batch_size=500, workers=None,
+                 on_generated=None, on_batch=None):
+    """Import users from the CSV text ``stream``; return an ``ImportResult``.
+
+    Existing emails are skipped, or with ``upsert`` have the role, major,
+    bio and password the row gives updated (empty cells leave the column
+    alone, and admins are skipped); a username owned by someone else
+    always skips the row. ``on_generated(email, password)`` receives
+    generated passwords; without it new rows lacking one are skipped.
+    ``on_batch(result)`` is called after each committed batch.
+    """
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    missing = {'username', 'email'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f'CSV is missing column(s): {", ".join(sorted(missing))}')
+
+    workers = workers or os.cpu_count() or 1
+    hasher = partial(generate_password_hash, method=current_app.config['PASSWORD_HASH_METHOD'])
+    seen_names, seen_emails = set(), set()
+    pool = None  # started on the first batch with passwords to hash
+    try:
+        for rows in _batches(enumerate(reader, start=2), batch_size):
+            result.rows += len(rows)
+            batch = []
+            for line, row in rows:
+                try:
+                    data = clean_row(row)
+                except ValueError as e:
+                    result.skipped.append((line, str(e)))
+                    continue
+                if data['username'] in seen_names or data['email'] in seen_emails:
+                    result.skipped.append((line, 'duplicate of an earlier row'))
+                    continue
+                seen_names.add(data['username'])
+                seen_emails.add(data['email'])
+                batch.append((line, data))
+            if not batch:
+                continue
+
+            hashes = {}
+            for attempt in range(2):
+                skipped = len(result.skipped)
+                inserts, updates = _classify(batch, upsert, result)
+                inserts = _with_passwords(inserts, on_generated is not None, result)
+                todo = [(line, d['password'])
+                        for line, d in inserts + [(line, d) for _, line, d in updates]
+                        if line not in hashes and d['password'] is not None]
+                if todo:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_hashing_context())
+                    chunksize = max(1, len(todo) // (4 * workers))
+                    hashes.update(zip((line for line, _ in todo),
+                                      pool.map(hasher, [pw for _, pw in todo], chunksize=chunksize)))
+                try:
+                    _write(inserts, updates, hashes)
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    # someone registered one of these meanwhile; re-check once
+                    db.session.rollback()
+                    del result.skipped[skipped:]
+                    if attempt:
+                        raise
+                    for line, d in batch:
+                        if d.pop('generated', False):
+                            d['password'] = None
+                            del hashes[line]
+
+            if on_generated is not None:
+                for line, d in inserts:
+                    if d.get('generated'):
+                        on_generated(d['email'], d['password'])
+            for user_id, _, _ in updates:
+                invalidate_user(user_id)
+            result.created += len(inserts)
+            result.updated += len(updates)
+            if on_batch is not None:
+                on_batch(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
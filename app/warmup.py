@@ -0,0 +1,47 @@
+"""Work a new worker would otherwise do during its first requests.
+
+On first use a fresh worker compiles every Jinja template it renders and
+opens its database connections (a TLS handshake each on Render), all
+while a user waits. With ``WARMUP_ENABLED`` the templates are compiled
+when the app is created. Under gunicorn's ``preload_app`` that happens
+once in the master and every worker inherits the result. Each worker also
+fills its connection pool in ``post_fork``, before it accepts requests.
+"""
+import time
+from sqlalchemy.exc import DBAPIError
+from app import db
+
+
+def prime_templates(app):
+    """Compile every HTML template into the Jinja cache; return how many."""
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def prime_pool(app):
+    """Open ``pool_size`` connections per engine (primary and replicas); return how many."""
+    opened = 0
+    with app.app_context():
+        for key, engine in db.engines.items():
+            size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+            connections = []
+            try:
+                for _ in range(size):
+                    connections.append(engine.connect())
+                    connections[-1].exec_driver_sql('SELECT 1')
+            except DBAPIError as e:
+                app.logger.warning('Could not warm up %s: %s', key or 'primary', e)
+            for connection in connections:
+                connection.close()
+            opened += len(connections)
+    return opened
+
+
+def init_app(app):
+    if not app.config['WARMUP_ENABLED']:
+        return
+    start = time.perf_counter()
+    count = prime_templates(app)
+    app.logger.info('Compiled %d templates in %.0f ms', count, (time.perf_counter() - start) * 1000)
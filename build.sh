@@ -6,6 +6,9 @@ set -o errexit
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Fingerprint and precompress static assets
+flask assets build
+
 # Run database migrations
 flask db upgrade
 
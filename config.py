@@ -1,9 +1,99 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+# Rough resident size of one gunicorn worker, used to cap the worker count
+WORKER_MEMORY_MB = int(os.environ.get('WORKER_MEMORY_MB', 128))
+# Connections this service may hold in total; leave headroom under the
+# database's own limit for migrations, psql and one-off jobs
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+
+
+def _database_url(url):
+    """Render uses postgres:// but SQLAlchemy needs postgresql://"""
+    if url and url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def _memory_limit_mb():
+    """The container's memory limit (cgroup v2 or v1), else physical memory."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 50:  # "max" or a huge number means no limit
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def server_workers():
+    """Gunicorn worker processes: WEB_CONCURRENCY, else 2 x CPUs + 1 capped by memory.
+
+    The automatic count is also capped at ``DB_MAX_CONNECTIONS`` so every
+    worker gets at least one connection.
+    """
+    if os.environ.get('WEB_CONCURRENCY'):
+        return max(1, int(os.environ['WEB_CONCURRENCY']))
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    workers = min(2 * cpus + 1, max(1, DB_MAX_CONNECTIONS))
+    memory = _memory_limit_mb()
+    if memory:
+        workers = min(workers, max(1, memory // WORKER_MEMORY_MB))
+    return workers
+
+
+def server_worker_class():
+    return os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+
+def server_threads():
+    """Request threads per worker (sync workers handle one request at a time)."""
+    if server_worker_class() == 'sync':
+        return 1
+    return int(os.environ.get('GUNICORN_THREADS', 4))
+
+
+def engine_options(workers, threads):
+    """Pool settings that keep ``workers`` processes under ``DB_MAX_CONNECTIONS`` together.
+
+    Each worker gets an equal share. The pool holds enough connections
+    for its request threads plus the avatar pool, and any spare share
+    becomes overflow. Raises ``ValueError`` when there are more workers
+    than connections.
+    """
+    if workers > DB_MAX_CONNECTIONS:
+        raise ValueError(f'{workers} workers need at least one database connection each, but '
+                         f'DB_MAX_CONNECTIONS is {DB_MAX_CONNECTIONS}; lower WEB_CONCURRENCY '
+                         f'or raise DB_MAX_CONNECTIONS')
+    share = DB_MAX_CONNECTIONS // workers
+    pool_size = min(share, threads + int(os.environ.get('AVATAR_WORKERS', 2)))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': share - pool_size,
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a connection
+        'pool_pre_ping': True,  # idle connections get dropped by the server/proxy
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 300)),
+    }
+
+
+def production_engine_options():
+    """``engine_options`` for the gunicorn.conf.py workers and threads.
+
+    Called when a production app is created rather than when this module
+    is imported, so a bad ``WEB_CONCURRENCY`` stops the server without
+    breaking scripts, tests or other configs that import ``config``.
+    """
+    return engine_options(server_workers(), server_threads())
+
 
 class Config:
     """Base configuration."""
@@ -14,32 +104,121 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max
     UPLOAD_FOLDER = os.path.join(basedir, os.environ.get('UPLOAD_FOLDER', 'app/static/uploads'))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    UPLOAD_URL = os.environ.get('UPLOAD_URL')  # defaults to /static/uploads
+    
+    # Where uploaded files are kept: 'local' (UPLOAD_FOLDER) or 's3'
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # CDN or bucket URL used in <img> tags
+    
+    # Avatar variants are rendered by a background thread pool
+    AVATAR_WORKERS = int(os.environ.get('AVATAR_WORKERS', 2))
+    AVATAR_PROCESS_INLINE = False
+    
+    # Fingerprinted static files written by `flask assets build`
+    ASSETS_FOLDER = os.path.join(basedir, 'dist')
+    ASSETS_ENABLED = os.environ.get('ASSETS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
     
     # Pagination
     POSTS_PER_PAGE = 10
     GIGS_PER_PAGE = 12
     COURSES_PER_PAGE = 15
+    SEARCH_RESULTS_PER_PAGE = 20
+    ADMIN_PER_PAGE = 50
+    EXPORT_BATCH_SIZE = 1000
+    
+    # Study-partner matching
+    MATCH_RESULTS = 10
+    MATCH_INDEX_TTL = int(os.environ.get('MATCH_INDEX_TTL', 300))  # seconds between full rebuilds
+    
+    # Rendered post fragments kept per worker
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 2048))
+    
+    # Password hashing; tune with `flask passwords calibrate`
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))  # concurrent hashes per process
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))  # waiting logins before 503
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds
+    
+    # Throttle login/registration attempts (counters shared through REDIS_URL when set)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # A whole campus can share one NAT address, so the per-IP caps are loose;
+    # the per-account limit is what stops password guessing
+    RATELIMIT_LOGIN_IP = os.environ.get('RATELIMIT_LOGIN_IP', '100/minute')
+    RATELIMIT_LOGIN_ACCOUNT = os.environ.get('RATELIMIT_LOGIN_ACCOUNT', '5/minute')
+    RATELIMIT_REGISTER_IP = os.environ.get('RATELIMIT_REGISTER_IP', '300/hour')
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+    
+    # Users loaded per request come from a per-worker cache; REDIS_URL shares
+    # invalidations (and snapshots) between workers instead of waiting out the TTL
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))  # seconds
+    REDIS_URL = os.environ.get('REDIS_URL')
+    
+    # Request metrics at /admin/metrics; METRICS_DIR aggregates all workers
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 10))  # seconds
+    
+    # Slow-query log with EXPLAIN plans (opt in); the file collects all workers' entries
+    SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_BUFFER = int(os.environ.get('SLOW_QUERY_BUFFER', 200))
+    SLOW_QUERY_ANALYZE_RATE = float(os.environ.get('SLOW_QUERY_ANALYZE_RATE', 0))  # PostgreSQL only
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE')
+    
+    # Sampling profiler started from /admin/profiler; the directory must be
+    # shared by all workers (settings and per-worker samples live there)
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'unishare-profiler')
+    PROFILER_INTERVAL_MS = int(os.environ.get('PROFILER_INTERVAL_MS', 10))
+    
+    # Compile templates at startup and fill each worker's pool before it serves
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '').lower() in ('1', 'true', 'yes')
+    
+    # Read replicas (comma-separated URLs); GET requests read from them, see app/replicas.py
+    SQLALCHEMY_BINDS = {f'replica{i}': _database_url(url.strip())
+                        for i, url in enumerate(os.environ.get('DATABASE_REPLICA_URLS', '').split(','))
+                        if url.strip()}
+    REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))  # primary-only after a write
+    REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))  # skip an unreachable replica
+    
+    # Raise instead of logging when a view exceeds its @query_budget
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes')
 
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    ASSETS_ENABLED = False  # serve live files while editing them
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'unishare.db')
 
 
+class TestingConfig(Config):
+    """Test configuration; tests/conftest.py passes a temporary database."""
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    ASSETS_ENABLED = False
+    METRICS_ENABLED = False
+    AVATAR_PROCESS_INLINE = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
-    
-    # Render uses postgres:// but SQLAlchemy needs postgresql://
-    if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
-        SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace('postgres://', 'postgresql://', 1)
+    SQLALCHEMY_DATABASE_URI = _database_url(os.environ.get('DATABASE_URL'))
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))  # Render's load balancer
+    # SQLALCHEMY_ENGINE_OPTIONS is sized by create_app, see production_engine_options()
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,42 @@
+"""Gunicorn settings for production: ``gunicorn -c gunicorn.conf.py run:app``.
+
+Worker count, worker class and threads come from ``config`` so the
+database pool (``config.production_engine_options``) is sized
+for the same numbers; set ``WEB_CONCURRENCY`` / ``GUNICORN_THREADS``
+rather than passing ``-w`` / ``--threads`` on the command line.
+
+The app is imported once in the master (``preload_app``) and shared with
+the workers copy-on-write, which saves memory and catches import errors
+before any worker starts. Anything opened during that import is inherited
+by every worker, so ``post_fork`` drops the inherited database connections.
+"""
+import os
+from config import server_threads, server_worker_class, server_workers
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = server_workers()
+worker_class = server_worker_class()
+threads = server_threads()
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5  # Render's load balancer reuses connections
+
+# Recycle workers now and then so slow leaks can't build up
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+forwarded_allow_ips = '*'  # client addresses are handled by ProxyFix (TRUSTED_PROXIES)
+
+
+def post_fork(server, worker):
+    """Forget the master's pooled connections; the worker opens its own."""
+    from app import db, warmup
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if app.config['WARMUP_ENABLED']:
+        warmup.prime_pool(app)
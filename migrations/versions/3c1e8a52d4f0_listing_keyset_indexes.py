@@ -0,0 +1,38 @@
+"""Composite (created_at, id) indexes for keyset pagination
+
+Revision ID: 3c1e8a52d4f0
+Revises: 9fa1df3273b7
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1e8a52d4f0'
+down_revision = '9fa1df3273b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('gigs', schema=None) as batch_op:
+        batch_op.create_index('ix_gigs_created_at_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_created_at_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.create_index('ix_courses_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_index('ix_courses_created_at_id')
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_posts_created_at_id')
+
+    with op.batch_alter_table('gigs', schema=None) as batch_op:
+        batch_op.drop_index('ix_gigs_created_at_id')
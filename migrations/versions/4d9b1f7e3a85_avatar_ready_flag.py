@@ -0,0 +1,28 @@
+"""Track whether a user's avatar variants have been rendered
+
+Revision ID: 4d9b1f7e3a85
+Revises: c2f6b8e04d17
+Create Date: 2026-10-18 19:31:08.402966
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d9b1f7e3a85'
+down_revision = 'c2f6b8e04d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing pictures are single pre-resized files and are ready as-is
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avatar_ready', sa.Boolean(), nullable=False,
+                                      server_default=sa.true()))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('avatar_ready')
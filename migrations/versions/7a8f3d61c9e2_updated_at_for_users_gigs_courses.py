@@ -0,0 +1,29 @@
+"""Add updated_at to users, gigs and courses
+
+Revision ID: 7a8f3d61c9e2
+Revises: e5a09c7b21d6
+Create Date: 2026-10-18 16:20:33.871254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a8f3d61c9e2'
+down_revision = 'e5a09c7b21d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('users', 'gigs', 'courses'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = created_at')
+
+
+def downgrade():
+    for table in ('courses', 'gigs', 'users'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,46 @@
+"""Reference-counted, content-addressed upload storage
+
+Revision ID: 8b5e2c9d7f14
+Revises: 4d9b1f7e3a85
+Create Date: 2026-10-18 20:12:44.118305
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5e2c9d7f14'
+down_revision = '4d9b1f7e3a85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    stored_files = op.create_table('stored_files',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('digest')
+    )
+
+    # Pictures with variants but a random base name predate hashing; track
+    # them under that name so their files are still reclaimed.
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT profile_picture, COUNT(*) FROM users "
+        "WHERE profile_picture IS NOT NULL AND profile_picture NOT LIKE '%.%' "
+        "GROUP BY profile_picture")).all()
+    if rows:
+        now = datetime.utcnow()
+        op.bulk_insert(stored_files, [
+            {'digest': picture, 'size': 0, 'content_type': None, 'refcount': count, 'created_at': now}
+            for picture, count in rows
+        ])
+
+
+def downgrade():
+    op.drop_table('stored_files')
@@ -0,0 +1,57 @@
+"""Stored excerpt, word count and reading time for posts
+
+Revision ID: a6e3f91c52b8
+Revises: f2c8d4a61b97
+Create Date: 2026-10-18 22:04:17.836120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.excerpts import ELLIPSIS, EXCERPT_LENGTH, summarize
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e3f91c52b8'
+down_revision = 'f2c8d4a61b97'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH + len(ELLIPSIS)), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+
+    # Backfill in id order, a batch of bodies at a time
+    conn = op.get_bind()
+    posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                     sa.column('excerpt', sa.String), sa.column('word_count', sa.Integer),
+                     sa.column('reading_time', sa.Integer))
+    update = posts.update().where(posts.c.id == sa.bindparam('post_id')).values(
+        excerpt=sa.bindparam('excerpt'), word_count=sa.bindparam('word_count'),
+        reading_time=sa.bindparam('reading_time'))
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.select(posts.c.id, posts.c.content).where(posts.c.id > last_id)
+                            .order_by(posts.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        conn.execute(update, [{'post_id': post_id, **summarize(content)} for post_id, content in rows])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.alter_column('excerpt', existing_type=sa.String(length=EXCERPT_LENGTH + len(ELLIPSIS)),
+                              nullable=False)
+        batch_op.alter_column('word_count', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('reading_time', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('excerpt')
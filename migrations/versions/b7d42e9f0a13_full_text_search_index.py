@@ -0,0 +1,59 @@
+"""Full-text search index for posts, courses and gigs
+
+Revision ID: b7d42e9f0a13
+Revises: 3c1e8a52d4f0
+Create Date: 2026-10-18 11:02:17.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d42e9f0a13'
+down_revision = '3c1e8a52d4f0'
+branch_labels = None
+depends_on = None
+
+
+# Document ids encode the content type: ref_id * 4 + kind
+SOURCES = [
+    (1, 'posts', 'title', 'content'),
+    (2, 'courses', 'title', 'description'),
+    (3, 'gigs', 'subject', 'major'),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE search_index "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        for code, table, title, body in SOURCES:
+            op.execute(
+                f"INSERT INTO search_index (rowid, title, body) "
+                f"SELECT id * 4 + {code}, {title}, COALESCE({body}, '') FROM {table}"
+            )
+
+    elif dialect == 'postgresql':
+        op.create_table('search_index',
+        sa.Column('doc_id', sa.BigInteger(), nullable=False),
+        sa.Column('document', sa.dialects.postgresql.TSVECTOR(), nullable=False),
+        sa.PrimaryKeyConstraint('doc_id')
+        )
+        op.create_index('ix_search_index_document', 'search_index', ['document'],
+                        unique=False, postgresql_using='gin')
+        for code, table, title, body in SOURCES:
+            op.execute(
+                f"INSERT INTO search_index (doc_id, document) "
+                f"SELECT id * 4 + {code}, "
+                f"setweight(to_tsvector('english', {title}), 'A') || "
+                f"setweight(to_tsvector('english', COALESCE({body}, '')), 'B') FROM {table}"
+            )
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS search_index')
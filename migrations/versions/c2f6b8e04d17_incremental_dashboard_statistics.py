@@ -0,0 +1,56 @@
+"""Incrementally maintained dashboard statistics
+
+Revision ID: c2f6b8e04d17
+Revises: 7a8f3d61c9e2
+Create Date: 2026-10-18 18:05:52.660418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f6b8e04d17'
+down_revision = '7a8f3d61c9e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site_statistics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('gigs', sa.Integer(), nullable=False),
+    sa.Column('posts', sa.Integer(), nullable=False),
+    sa.Column('courses', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('daily_statistics',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('gigs', sa.Integer(), nullable=False),
+    sa.Column('posts', sa.Integer(), nullable=False),
+    sa.Column('courses', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+    op.execute(
+        "INSERT INTO site_statistics (id, users, gigs, posts, courses, updated_at) SELECT 1, "
+        "(SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM gigs), "
+        "(SELECT COUNT(*) FROM posts), (SELECT COUNT(*) FROM courses), CURRENT_TIMESTAMP"
+    )
+    op.execute(
+        "INSERT INTO daily_statistics (day, users, gigs, posts, courses) "
+        "SELECT day, SUM(u), SUM(g), SUM(p), SUM(c) FROM ("
+        "SELECT date(created_at) AS day, 1 AS u, 0 AS g, 0 AS p, 0 AS c FROM users "
+        "UNION ALL SELECT date(created_at), 0, 1, 0, 0 FROM gigs "
+        "UNION ALL SELECT date(created_at), 0, 0, 1, 0 FROM posts "
+        "UNION ALL SELECT date(created_at), 0, 0, 0, 1 FROM courses"
+        ") AS created GROUP BY day"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_statistics')
+    op.drop_table('site_statistics')
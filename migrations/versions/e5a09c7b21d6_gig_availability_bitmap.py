@@ -0,0 +1,52 @@
+"""Weekly availability bitmap and slot index for gigs
+
+Revision ID: e5a09c7b21d6
+Revises: b7d42e9f0a13
+Create Date: 2026-10-18 13:46:05.204377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.availability import BITMAP_BYTES, parse_availability, to_bytes, iter_slots
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a09c7b21d6'
+down_revision = 'b7d42e9f0a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('gigs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('availability', sa.LargeBinary(length=BITMAP_BYTES), nullable=True))
+
+    gig_slots = op.create_table('gig_slots',
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('gig_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['gig_id'], ['gigs.id'], ),
+    sa.PrimaryKeyConstraint('slot', 'gig_id')
+    )
+    with op.batch_alter_table('gig_slots', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_gig_slots_gig_id'), ['gig_id'], unique=False)
+
+    # Backfill from the free-text column; entries we can't read stay empty
+    conn = op.get_bind()
+    gigs = sa.table('gigs', sa.column('id', sa.Integer), sa.column('availability', sa.LargeBinary))
+    for gig_id, text in conn.execute(sa.text('SELECT id, available_hours FROM gigs')).all():
+        try:
+            mask = parse_availability(text)
+        except ValueError:
+            continue
+        conn.execute(gigs.update().where(gigs.c.id == gig_id).values(availability=to_bytes(mask)))
+        op.bulk_insert(gig_slots, [{'slot': slot, 'gig_id': gig_id} for slot in iter_slots(mask)])
+
+
+def downgrade():
+    with op.batch_alter_table('gig_slots', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_gig_slots_gig_id'))
+
+    op.drop_table('gig_slots')
+    with op.batch_alter_table('gigs', schema=None) as batch_op:
+        batch_op.drop_column('availability')
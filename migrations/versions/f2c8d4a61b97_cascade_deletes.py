@@ -0,0 +1,47 @@
+"""ON DELETE CASCADE for content owned by users and slots owned by gigs
+
+Revision ID: f2c8d4a61b97
+Revises: 8b5e2c9d7f14
+Create Date: 2026-10-18 21:12:40.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d4a61b97'
+down_revision = '8b5e2c9d7f14'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ('gigs', 'user_id', 'users'),
+    ('posts', 'user_id', 'users'),
+    ('courses', 'teacher_id', 'users'),
+    ('gig_slots', 'gig_id', 'gigs'),
+]
+
+# SQLite's foreign keys are unnamed; batch mode needs a name to drop one
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _replace_foreign_key(table, column, referred, ondelete):
+    name = f'fk_{table}_{column}_{referred}'
+    existing = [fk['name'] for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+                if fk['constrained_columns'] == [column]]
+    with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        for old_name in existing:
+            batch_op.drop_constraint(old_name or name, type_='foreignkey')
+        batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    for table, column, referred in FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, 'CASCADE')
+
+
+def downgrade():
+    for table, column, referred in reversed(FOREIGN_KEYS):
+        _replace_foreign_key(table, column, referred, None)
@@ -0,0 +1,84 @@
+import pytest
+import flask_migrate
+from app import create_app, db
+from app.models import Gig, Post, User
+from app.seed import USERNAME_PREFIX, seed
+
+
+def make_app(tmp_path, **overrides):
+    """An app on a fresh SQLite file in ``tmp_path``, migrated to head."""
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'PROFILER_DIR': str(tmp_path / 'profiler'),
+        **overrides,
+    })
+    with app.app_context():
+        flask_migrate.Migrate(app, db)
+        flask_migrate.upgrade(directory='migrations')
+    return app
+
+
+@pytest.fixture
+def app_factory(tmp_path):
+    """``make_app`` on this test's temporary directory."""
+    return lambda **overrides: make_app(tmp_path, **overrides)
+
+
+@pytest.fixture
+def app(app_factory):
+    """A fresh, empty app.
+
+    Requests made while a test holds an app context would share its ``g``
+    (and so Flask-Login's current user); set up data inside
+    ``app.app_context()`` blocks, or use ``app_ctx`` when no requests are made.
+    """
+    return app_factory()
+
+
+@pytest.fixture
+def app_ctx(app):
+    """A fresh, empty app, inside its app context."""
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope='session')
+def seeded_app(tmp_path_factory):
+    """A small seeded dataset shared by read-only tests."""
+    app = make_app(tmp_path_factory.mktemp('seeded'))
+    with app.app_context():
+        seed(users=60, posts=200, gigs=80, courses=40)
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(seeded_app):
+    return seeded_app.test_client()
+
+
+def log_in(client, username):
+    """Log ``client`` in as ``username`` without going through the form."""
+    with client.application.app_context():
+        user_id = db.session.execute(db.select(User.id).filter_by(username=username)).scalar_one()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return user_id
+
+
+@pytest.fixture
+def login():
+    return log_in
+
+
+@pytest.fixture
+def sample(seeded_app):
+    """Usernames and ids the route tests need."""
+    with seeded_app.app_context():
+        gig_owner = db.session.execute(db.select(User.username).join(Gig, Gig.user_id == User.id)
+                                       .filter(User.role == 'student').limit(1)).scalar_one()
+        post = db.session.execute(db.select(Post.id, User.username).join(Post.author).limit(1)).one()
+    return {'admin': f'{USERNAME_PREFIX}admin', 'student': gig_owner,
+            'post_id': post.id, 'author': post.username}
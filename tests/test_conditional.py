@@ -0,0 +1,62 @@
+import pytest
+from app import db
+from app.models import Post, User
+
+
+@pytest.fixture
+def post_id(app):
+    with app.app_context():
+        for name in ('ana', 'ben'):
+            user = User(username=name, email=f'{name}@example.com', role='student', major='Physics')
+            user.set_password('secret1')
+            db.session.add(user)
+        db.session.flush()
+        post = Post(user_id=User.query.filter_by(username='ana').one().id, title='Optics')
+        post.set_content('Lenses and mirrors.')
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def test_repeat_request_with_etag_is_a_bodyless_304(app, post_id):
+    client = app.test_client()
+    for url in ('/posts/', f'/posts/{post_id}', '/profile/ana', '/gigs/', '/courses/'):
+        first = client.get(url)
+        assert first.status_code == 200 and first.headers['ETag']
+        repeat = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert repeat.status_code == 304, url
+        assert repeat.data == b''
+
+
+def test_viewers_get_different_validators(app, post_id, login):
+    url = f'/posts/{post_id}'
+    anonymous, author, other = app.test_client(), app.test_client(), app.test_client()
+    login(author, 'ana')
+    login(other, 'ben')
+    etags = [client.get(url).headers['ETag'] for client in (anonymous, author, other)]
+    assert len(set(etags)) == 3
+    # another viewer's validator never earns a 304
+    assert author.get(url, headers={'If-None-Match': etags[0]}).status_code == 200
+    assert other.get(url, headers={'If-None-Match': etags[1]}).status_code == 200
+
+
+def test_edit_changes_the_validator(app, post_id):
+    client = app.test_client()
+    before = client.get(f'/posts/{post_id}').headers['ETag']
+    with app.app_context():
+        db.session.get(Post, post_id).title = 'Optics, revised'
+        db.session.commit()
+    response = client.get(f'/posts/{post_id}', headers={'If-None-Match': before})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != before
+    assert 'Optics, revised' in response.get_data(as_text=True)
+
+
+def test_page_with_pending_flash_is_never_304(app, post_id):
+    client = app.test_client()
+    etag = client.get('/posts/').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Your post has been published!')]
+    response = client.get('/posts/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Your post has been published!' in response.get_data(as_text=True)
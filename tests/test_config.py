@@ -0,0 +1,40 @@
+import importlib
+import pytest
+import config
+from app import create_app
+from config import DB_MAX_CONNECTIONS, engine_options, server_workers
+
+
+@pytest.mark.parametrize('workers', range(1, DB_MAX_CONNECTIONS + 1))
+@pytest.mark.parametrize('threads', [1, 4, 16])
+def test_pools_stay_under_the_connection_cap(workers, threads):
+    options = engine_options(workers, threads)
+    assert options['pool_size'] >= 1
+    assert workers * (options['pool_size'] + options['max_overflow']) <= DB_MAX_CONNECTIONS
+
+
+def test_more_workers_than_connections_is_refused():
+    with pytest.raises(ValueError, match='DB_MAX_CONNECTIONS'):
+        engine_options(DB_MAX_CONNECTIONS + 1, 4)
+
+
+def test_automatic_worker_count_fits_the_connection_cap(monkeypatch):
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.setattr(config.os, 'cpu_count', lambda: 64)
+    monkeypatch.setattr(config.os, 'sched_getaffinity', lambda pid: set(range(64)), raising=False)
+    monkeypatch.setattr(config, '_memory_limit_mb', lambda: None)
+    assert server_workers() == DB_MAX_CONNECTIONS
+
+
+def test_too_many_workers_only_stops_production(monkeypatch, app_factory):
+    monkeypatch.setenv('WEB_CONCURRENCY', str(DB_MAX_CONNECTIONS + 30))
+    importlib.reload(config)  # importing config must not size the pool
+    app_factory()
+    with pytest.raises(ValueError, match='WEB_CONCURRENCY'):
+        create_app('production', {'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+
+def test_production_pool_is_sized_for_the_workers(monkeypatch, tmp_path):
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'prod.db'}"})
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == engine_options(4, config.server_threads())
@@ -0,0 +1,67 @@
+import pytest
+from app import db
+from app.models import Post, User
+
+
+@pytest.fixture
+def post_id(app):
+    with app.app_context():
+        user = User(username='ana', email='ana@example.com', role='student', major='Physics')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.flush()
+        post = Post(user_id=user.id, title='Original title')
+        post.set_content('Original body about optics.')
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def _pages(client, post_id):
+    """Render the list and detail pages, filling the fragment cache."""
+    return (client.get('/posts/').get_data(as_text=True),
+            client.get(f'/posts/{post_id}').get_data(as_text=True))
+
+
+def _tagged(app, tag):
+    return bool(app.extensions['fragment_cache']._tags.get(tag))
+
+
+def test_edit_post_drops_and_rerenders_fragments(app, post_id, login):
+    client = app.test_client()
+    login(client, 'ana')
+    _pages(client, post_id)
+    assert _tagged(app, f'post:{post_id}')
+
+    response = client.post(f'/posts/{post_id}/edit',
+                           data={'title': 'Edited title', 'content': 'Edited body about lenses.'})
+    assert response.status_code == 302
+    assert not _tagged(app, f'post:{post_id}')
+
+    for html in _pages(client, post_id):
+        assert 'Edited title' in html and 'Edited body about lenses.' in html
+        assert 'Original' not in html
+
+
+def test_delete_post_drops_fragments(app, post_id, login):
+    client = app.test_client()
+    login(client, 'ana')
+    _pages(client, post_id)
+    assert client.post(f'/posts/{post_id}/delete').status_code == 302
+    assert not _tagged(app, f'post:{post_id}')
+    assert 'Original title' not in client.get('/posts/').get_data(as_text=True)
+    assert client.get(f'/posts/{post_id}').status_code == 404
+
+
+def test_username_change_drops_fragments(app, post_id, login):
+    client = app.test_client()
+    user_id = login(client, 'ana')
+    _pages(client, post_id)
+    assert _tagged(app, f'user:{user_id}')
+
+    response = client.post('/profile/edit', data={'username': 'ana_b', 'email': 'ana@example.com',
+                                                  'bio': '', 'major': 'Physics'})
+    assert response.status_code == 302
+    assert not _tagged(app, f'user:{user_id}')
+    for html in _pages(client, post_id):
+        assert 'ana_b' in html
@@ -0,0 +1,25 @@
+import re
+from app.availability import parse_availability
+from app.models import Gig
+
+FREE = 'weekdays 9-17'
+
+
+def _page(client, **args):
+    html = client.get('/gigs/', query_string={'free': FREE, **args}).get_data(as_text=True)
+    hours = [int(h) for h in re.findall(r'Overlaps your free time:</strong> (\d+) h/week', html)]
+    after = re.search(r'after=([\w-]+)', html)
+    return hours, after and after.group(1)
+
+
+def test_free_filter_orders_by_overlap(client, seeded_app):
+    with seeded_app.app_context():
+        mask = parse_availability(FREE)
+        expected = sorted((g.availability_mask & mask).bit_count() for g in Gig.query)
+        expected = [h for h in reversed(expected) if h]
+
+    hours, after = _page(client)
+    while after:
+        more, after = _page(client, after=after)
+        hours += more
+    assert len(expected) > 12 and hours == expected  # more than one page
@@ -0,0 +1,4 @@
+def test_calibrate_rejects_memory_below_smallest_scrypt_cost(app):
+    result = app.test_cli_runner().invoke(args=['passwords', 'calibrate', '--max-memory-mb', '2'])
+    assert result.exit_code == 1
+    assert 'scrypt needs at least 4 MiB per hash' in result.output
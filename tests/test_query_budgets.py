@@ -0,0 +1,45 @@
+"""Every ``@query_budget`` view, requested against seeded data.
+
+``TESTING`` makes an over-budget view raise ``QueryBudgetExceeded``, so a
+view that starts issuing a query per row fails here.
+"""
+import pytest
+
+PUBLIC_PAGES = [
+    '/posts/',
+    '/posts/{post_id}',
+    '/gigs/',
+    '/gigs/?free=Mon 14-17',
+    '/courses/',
+    '/search/?q=midterm',
+    '/profile/{author}',
+]
+
+ADMIN_PAGES = [
+    '/admin/dashboard',
+    '/admin/users',
+    '/admin/content',
+]
+
+
+def _get(client, url, sample):
+    response = client.get(url.format(**sample))
+    assert response.status_code == 200, url
+    return response
+
+
+@pytest.mark.parametrize('url', PUBLIC_PAGES)
+def test_public_pages_within_budget(client, sample, url):
+    _get(client, url, sample)
+
+
+@pytest.mark.parametrize('url', ADMIN_PAGES)
+def test_admin_pages_within_budget(client, login, sample, url):
+    login(client, sample['admin'])
+    _get(client, url, sample)
+
+
+def test_matches_within_budget(client, login, sample):
+    login(client, sample['student'])
+    _get(client, '/gigs/matches', sample)
+    _get(client, '/gigs/matches', sample)  # with the index built
@@ -0,0 +1,20 @@
+def _login(client, email, ip):
+    return client.post('/auth/login', data={'email': email, 'password': 'wrong'},
+                       environ_base={'REMOTE_ADDR': ip}).status_code
+
+
+def test_login_limits_come_from_config(app_factory):
+    app = app_factory(RATELIMIT_ENABLED=True, RATELIMIT_LOGIN_IP='6/minute',
+                      RATELIMIT_LOGIN_ACCOUNT='2/minute')
+    client = app.test_client()
+    # one address, many accounts: only the per-IP policy applies
+    assert [_login(client, f'user{i}@example.com', '10.0.0.1') for i in range(7)] == [302] * 6 + [429]
+    # one account guessed from several addresses: the per-account policy applies
+    assert [_login(client, 'victim@example.com', f'10.0.1.{i}') for i in range(3)] == [302, 302, 429]
+
+
+def test_default_ip_caps_allow_a_shared_campus_address(app_factory):
+    app = app_factory(RATELIMIT_ENABLED=True)
+    client = app.test_client()
+    statuses = {_login(client, f'student{i}@example.com', '10.0.0.1') for i in range(50)}
+    assert statuses == {302}
@@ -0,0 +1,100 @@
+"""Read-replica routing against two SQLite files.
+
+The replica is a copy of the primary file; ``replicate`` re-copies it, so
+anything written in between is "lag".
+"""
+import shutil
+import pytest
+from app import db
+from app.models import Gig, Post, User
+from app.user_delete import delete_users
+
+
+@pytest.fixture
+def replica_app(app_factory, tmp_path):
+    app = app_factory(SQLALCHEMY_BINDS={'replica0': f"sqlite:///{tmp_path / 'replica.db'}"})
+
+    def replicate():
+        with app.app_context():
+            db.engines['replica0'].dispose()
+        shutil.copyfile(tmp_path / 'primary.db', tmp_path / 'replica.db')
+
+    app.replicate = replicate
+    with app.app_context():
+        for name, role in (('ana', 'student'), ('ben', 'student'), ('root', 'admin')):
+            user = User(username=name, email=f'{name}@example.com', role=role, major='Physics')
+            user.set_password('secret1')
+            db.session.add(user)
+        db.session.flush()
+        gig = Gig(user_id=User.query.filter_by(username='ana').one().id, major='Physics',
+                  subject='Optics')
+        gig.set_availability('Mon 14-17')
+        db.session.add(gig)
+        db.session.commit()
+    replicate()
+    return app
+
+
+def _add_post(app, title):
+    with app.app_context():
+        author = User.query.filter_by(username='ana').one()
+        post = Post(user_id=author.id, title=title)
+        post.set_content('Written on the primary.')
+        db.session.add(post)
+        db.session.commit()
+
+
+def test_get_requests_read_from_the_replica(replica_app):
+    _add_post(replica_app, 'Not replicated yet')
+    client = replica_app.test_client()
+    assert 'Not replicated yet' not in client.get('/posts/').get_data(as_text=True)
+    replica_app.replicate()
+    assert 'Not replicated yet' in client.get('/posts/').get_data(as_text=True)
+
+
+def test_writer_is_pinned_to_the_primary(replica_app, login):
+    client = replica_app.test_client()
+    login(client, 'ana')
+    response = client.post('/posts/create', data={'title': 'Fresh post', 'content': 'Hello there'})
+    assert response.status_code == 302
+    assert client.get_cookie('db_pin') is not None
+    assert 'Fresh post' in client.get('/posts/').get_data(as_text=True)
+    # a client without the pin still reads the lagging replica
+    assert 'Fresh post' not in replica_app.test_client().get('/posts/').get_data(as_text=True)
+
+
+def test_unreachable_replica_falls_back_to_the_primary(app_factory, tmp_path):
+    app = app_factory(SQLALCHEMY_BINDS={'replica0': f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"})
+    assert app.test_client().get('/posts/').status_code == 200
+    assert app.extensions['replicas'].available() == []
+
+
+def test_identity_cache_is_filled_from_the_primary(replica_app, login):
+    client = replica_app.test_client()
+    login(client, 'ben')
+    assert client.get('/gigs/matches').status_code == 200
+    with replica_app.app_context():
+        delete_users([User.query.filter_by(username='ben').one().id])
+    # the replica still has ben; the reload after invalidation must not use it
+    assert client.get('/gigs/matches').status_code == 302
+    replica_app.replicate()
+    assert client.get('/gigs/matches').status_code == 302
+
+
+def test_match_index_is_filled_from_the_primary(replica_app, login):
+    with replica_app.app_context():
+        cleo = User(username='cleo', email='cleo@example.com', role='student', major='Physics')
+        cleo.set_password('secret1')
+        db.session.add(cleo)
+        db.session.flush()
+        gig = Gig(user_id=cleo.id, major='Physics', subject='Optics')
+        gig.set_availability('Mon 14-17')
+        db.session.add(gig)
+        db.session.commit()
+        cleo_id = cleo.id
+
+    client = replica_app.test_client()
+    login(client, 'ana')
+    assert client.get('/gigs/matches').status_code == 200
+    # the page's own queries may lag, but the process-wide index must not
+    assert cleo_id in replica_app.extensions['match_index'].vectors
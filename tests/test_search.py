@@ -0,0 +1,74 @@
+import pytest
+from app import db
+from app.models import Course, Gig, Post, User
+from app.search import search
+
+
+def _user(username, role='student'):
+    user = User(username=username, email=f'{username}@example.com', role=role, major='Physics')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _found(query, kind):
+    return [result.obj.id for result in search(query, kinds=[kind])[0]]
+
+
+def _post(user, title, content):
+    post = Post(user_id=user.id, title=title)
+    post.set_content(content)
+    return post
+
+
+def _gig(user, subject, major):
+    gig = Gig(user_id=user.id, major=major, subject=subject)
+    gig.set_availability('Mon 14-17')
+    return gig
+
+
+@pytest.mark.parametrize('kind, make, edit', [
+    ('post', lambda s, t: _post(s, 'Thermodynamics notes', 'Entropy explained.'),
+     lambda obj: setattr(obj, 'title', 'Electromagnetism notes')),
+    ('course', lambda s, t: Course(teacher_id=t.id, title='Thermodynamics course',
+                                   description='Entropy lectures', link='http://x.com'),
+     lambda obj: setattr(obj, 'title', 'Electromagnetism course')),
+    ('gig', lambda s, t: _gig(s, 'Thermodynamics', 'Physics'),
+     lambda obj: setattr(obj, 'subject', 'Electromagnetism')),
+])
+def test_index_follows_create_edit_delete(app_ctx, kind, make, edit):
+    student, teacher = _user('ana'), _user('prof', 'teacher')
+    obj = make(student, teacher)
+    db.session.add(obj)
+    db.session.commit()
+    assert _found('thermodynamics', kind) == [obj.id]
+
+    edit(obj)
+    db.session.commit()
+    assert _found('thermodynamics', kind) == []
+    assert _found('electromagnetism', kind) == [obj.id]
+
+    db.session.delete(obj)
+    db.session.commit()
+    assert _found('electromagnetism', kind) == []
+
+
+@pytest.mark.parametrize('query', [
+    '"unbalanced', 'entropy NEAR(heat', '-entropy', 'entr*', 'title:entropy', 'a AND OR NOT',
+    "entropy'); DROP TABLE posts; --",
+])
+def test_fts_syntax_in_queries_is_escaped(app_ctx, query):
+    db.session.add(_post(_user('ana'), 'Entropy', 'Heat and entropy.'))
+    db.session.commit()
+    results, _ = search(query)
+    assert all(result.kind == 'post' for result in results)
+    assert app_ctx.test_client().get('/search/', query_string={'q': query}).status_code == 200
+
+
+def test_terms_match_as_prefixes(app_ctx):
+    post = _post(_user('ana'), 'Entropy', 'Heat and entropy.')
+    db.session.add(post)
+    db.session.commit()
+    assert _found('entr*', 'post') == [post.id]
+    assert _found('-entropy', 'post') == [post.id]  # a leading minus is not negation
@@ -0,0 +1,21 @@
+import shutil
+from app import db
+from app.models import User
+from app.slowlog import get_log
+
+
+def test_replica_queries_are_recorded_with_their_bind(app_factory, tmp_path):
+    app = app_factory(SLOW_QUERY_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0,
+                      SQLALCHEMY_BINDS={'replica0': f"sqlite:///{tmp_path / 'replica.db'}"})
+    shutil.copyfile(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    with app.app_context():
+        db.session.add(User(username='ana', email='ana@example.com', role='student',
+                            major='Physics', password_hash='x'))
+        db.session.commit()
+    assert app.test_client().get('/posts/').status_code == 200
+
+    with app.app_context():
+        entries = get_log().recent()
+    seen = {(entry['bind'], entry['endpoint'], entry['statement'].split()[0]) for entry in entries}
+    assert ('replica0', 'posts.list_posts', 'SELECT') in seen
+    assert ('primary', None, 'INSERT') in seen
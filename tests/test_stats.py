@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Course, DailyStatistics, Gig, Post, SiteStatistics, User
+from app.stats import COUNTED, reconcile
+from app.user_delete import delete_users
+
+DAY = timedelta(days=1)
+
+
+def _snapshot():
+    """Totals and non-empty daily buckets as plain data."""
+    db.session.expire_all()
+    site = db.session.get(SiteStatistics, 1)
+    totals = {column: getattr(site, column) for column in COUNTED.values()}
+    daily = {row.day: tuple(getattr(row, column) for column in COUNTED.values())
+             for row in DailyStatistics.query}
+    return totals, {day: counts for day, counts in daily.items() if any(counts)}
+
+
+def _create(username, role, created_at):
+    user = User(username=username, email=f'{username}@example.com', role=role,
+                major='Physics' if role == 'student' else None, created_at=created_at)
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.flush()
+    for offset in range(3):
+        when = created_at + offset * DAY
+        if role == 'student':
+            gig = Gig(user_id=user.id, major='Physics', subject=f'Optics {offset}', created_at=when)
+            gig.set_availability('Mon 14-17')
+            db.session.add(gig)
+        else:
+            db.session.add(Course(teacher_id=user.id, title=f'Course {offset}', link='http://x.com',
+                                  created_at=when))
+        post = Post(user_id=user.id, title=f'Post {offset}', created_at=when)
+        post.set_content('Body.')
+        db.session.add(post)
+    db.session.commit()
+    return user
+
+
+def test_incremental_counters_match_reconcile(app_ctx):
+    start = datetime(2026, 9, 1, 12)
+    ana = _create('ana', 'student', start)
+    ben = _create('ben', 'student', start + DAY)
+    prof = _create('prof', 'teacher', start + 2 * DAY)
+    _create('root', 'admin', start)
+
+    # ORM deletes, one of them on an expired object
+    db.session.delete(ana.posts.first())
+    db.session.delete(prof.courses.first())
+    db.session.commit()
+    db.session.delete(Gig.query.filter_by(user_id=ben.id).first())
+    db.session.commit()
+    # bulk delete, with the database cascading to owned content
+    delete_users([ben.id, prof.id])
+
+    incremental = _snapshot()
+    reconcile()
+    assert _snapshot() == incremental
+    assert incremental[0] == {'users': 2, 'gigs': 3, 'posts': 5, 'courses': 3}
+
+
+def test_reconcile_command_reports_totals(app_ctx):
+    _create('ana', 'student', datetime(2026, 9, 1))
+    result = app_ctx.test_cli_runner().invoke(args=['stats', 'reconcile'])
+    assert result.exit_code == 0
+    assert _snapshot()[0] == {'users': 1, 'gigs': 3, 'posts': 3, 'courses': 0}
@@ -0,0 +1,55 @@
+import io
+import sqlite3
+from werkzeug.datastructures import FileStorage
+from app import db
+from app import storage
+from app.images import accept_avatar, avatar_keys
+
+PNG = b'\x89PNG\r\n\x1a\n not really an image'
+
+
+def _upload():
+    return FileStorage(stream=io.BytesIO(PNG), filename='me.png', content_type='image/png')
+
+
+def test_second_upload_shares_the_blob(app_ctx):
+    first, created = storage.store_upload(_upload(), suffix='.orig')
+    second, created_again = storage.store_upload(_upload(), suffix='.orig')
+    db.session.commit()
+    assert first == second and created and not created_again
+    assert not storage.release(first, avatar_keys(first))
+    assert storage.get_backend().exists(first + '.orig')
+
+
+def test_upload_after_release_rewrites_leftover_files(app_ctx):
+    # files still on disk from a release that has deleted the row but not the files yet
+    digest, _ = storage.store_upload(_upload(), suffix='.orig')
+    db.session.execute(storage.StoredFile.__table__.delete())
+    db.session.commit()
+
+    digest, ready = accept_avatar(_upload())
+    db.session.commit()
+    assert not ready  # leftover variants may be deleted any moment; render new ones
+    with storage.get_backend().open(digest + '.orig') as f:
+        assert f.read() == PNG
+
+
+def test_release_removes_files_before_committing(app_ctx, tmp_path):
+    digest, _ = storage.store_upload(_upload(), suffix='.orig')
+    db.session.commit()
+    backend = storage.get_backend()
+    seen = []
+
+    def delete(key, delete=backend.delete):
+        # another connection still sees the row, so a concurrent acquire waits for us
+        with sqlite3.connect(tmp_path / 'primary.db') as other:
+            seen.append(other.execute('SELECT refcount FROM stored_files').fetchall())
+        delete(key)
+
+    backend.delete = delete
+    try:
+        assert storage.release(digest, [digest + '.orig'])
+    finally:
+        del backend.delete
+    assert seen == [[(1,)]]
+    assert not backend.exists(digest + '.orig')
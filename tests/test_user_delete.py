@@ -0,0 +1,93 @@
+"""``delete_users`` against a seeded SQLite file with foreign keys enforced."""
+import io
+import pytest
+from sqlalchemy import func, text
+from werkzeug.datastructures import FileStorage
+from app import db, storage
+from app.images import accept_avatar
+from app.models import Course, Gig, GigSlot, Post, SiteStatistics, User
+from app.queries import count_queries
+from app.search import DOCUMENTS, doc_id
+from app.seed import seed
+from app.stats import COUNTED, exact_totals
+from app.user_delete import OWNER_BY_MODEL, delete_users
+
+
+@pytest.fixture
+def seeded(app_ctx):
+    seed(users=30, posts=120, gigs=50, courses=20)
+    assert db.session.execute(text('PRAGMA foreign_keys')).scalar() == 1
+    return app_ctx
+
+
+def _owners(count):
+    """Ids of ``count`` users who own gigs, and of a teacher with courses."""
+    students = db.session.execute(db.select(Gig.user_id).distinct().order_by(Gig.user_id)
+                                  .limit(count)).scalars().all()
+    teacher = db.session.execute(db.select(Course.teacher_id).limit(1)).scalar_one()
+    return students + [teacher]
+
+
+def _count(model, *where):
+    return db.session.execute(db.select(func.count()).select_from(model).where(*where)).scalar()
+
+
+def test_statement_count_does_not_grow_with_users(seeded):
+    few = _owners(1)
+    many = [uid for uid in _owners(8) if uid not in few]
+    counts = []
+    for user_ids in (few, many):
+        with count_queries() as counter:
+            delete_users(user_ids)
+        counts.append(counter.count)
+    assert counts[0] == counts[1]
+
+
+def test_owned_rows_and_index_entries_are_gone(seeded):
+    user_ids = _owners(5)
+    docs = {kind: db.session.execute(db.select(model.id).where(OWNER_BY_MODEL[model].in_(user_ids)))
+            .scalars().all()
+            for kind, (_, model, _, _) in DOCUMENTS.items()}
+    expected = {'users': len(user_ids), 'gigs': len(docs['gig']), 'posts': len(docs['post']),
+                'courses': len(docs['course'])}
+    assert all(expected.values())
+
+    assert delete_users(user_ids) == expected
+    assert _count(User, User.id.in_(user_ids)) == 0
+    for model, owner in OWNER_BY_MODEL.items():
+        assert _count(model, ~owner.in_(db.select(User.id))) == 0
+    assert _count(GigSlot, ~GigSlot.gig_id.in_(db.select(Gig.id))) == 0
+
+    gone = [doc_id(kind, ref_id) for kind, ids in docs.items() for ref_id in ids]
+    left = db.session.execute(text('SELECT rowid FROM search_index')).scalars().all()
+    assert not set(gone) & set(left)
+    assert len(left) == _count(Gig) + _count(Post) + _count(Course)
+
+
+def test_dashboard_totals_match_exact_counts(seeded):
+    delete_users(_owners(6))
+    db.session.expire_all()
+    site = db.session.get(SiteStatistics, 1)
+    assert {column: getattr(site, column) for column in COUNTED.values()} == \
+        exact_totals(db.session.connection())
+
+
+def _upload():
+    return FileStorage(stream=io.BytesIO(b'\x89PNG\r\n\x1a\n not really an image'), filename='me.png',
+                       content_type='image/png')
+
+
+def test_shared_picture_is_released_with_its_last_user(seeded):
+    ana, ben = _owners(2)[:2]
+    digest, _ = accept_avatar(_upload())
+    accept_avatar(_upload())
+    db.session.execute(User.__table__.update().where(User.id.in_([ana, ben]))
+                       .values(profile_picture=digest))
+    db.session.commit()
+    backend = storage.get_backend()
+
+    delete_users([ana])
+    assert backend.exists(digest + '.orig')  # ben still uses it
+    delete_users([ben])
+    assert not backend.exists(digest + '.orig')
+    assert _count(storage.StoredFile) == 0
@@ -0,0 +1,72 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from app import db, user_import
+from app.models import User
+from app.user_import import import_users
+
+
+def _user(username, role, major=None, bio=None):
+    user = User(username=username, email=f'{username}@example.com', role=role, major=major, bio=bio)
+    user.set_password('secret1')
+    db.session.add(user)
+    return user
+
+
+def _import(text, **kwargs):
+    generated = {}
+    result = import_users(io.StringIO(text), workers=1, on_generated=generated.__setitem__, **kwargs)
+    db.session.expire_all()
+    return result, generated
+
+
+def test_upsert_keeps_columns_the_file_leaves_out(app_ctx):
+    _user('boss', 'admin')
+    _user('prof', 'teacher', bio='Teaches calculus')
+    _user('kim', 'student', major='Physics', bio='Likes labs')
+    db.session.commit()
+
+    result, generated = _import('username,email,major,bio\n'
+                                'boss,boss@example.com,,\n'
+                                'prof,prof@example.com,,\n'
+                                'kim,kim@example.com,,New bio\n'
+                                'lee,lee@example.com,Biology,\n', upsert=True)
+
+    assert result.created == 1 and result.updated == 1
+    assert result.skipped == [(2, 'existing admin account, not changed by imports'),
+                              (3, 'nothing to update')]
+    users = {u.username: u for u in User.query}
+    assert (users['boss'].role, users['prof'].role) == ('admin', 'teacher')
+    assert users['prof'].bio == 'Teaches calculus'
+    assert (users['kim'].role, users['kim'].major, users['kim'].bio) == ('student', 'Physics', 'New bio')
+    assert (users['lee'].role, users['lee'].major) == ('student', 'Biology')
+    assert list(generated) == ['lee@example.com']
+
+
+def test_upsert_role_change_clears_major(app_ctx):
+    _user('kim', 'student', major='Physics')
+    db.session.commit()
+    result, _ = _import('username,email,role\nkim,kim@example.com,teacher\n', upsert=True)
+    kim = User.query.filter_by(username='kim').one()
+    assert result.updated == 1 and (kim.role, kim.major) == ('teacher', None)
+
+
+def test_batches_without_passwords_start_no_pool(app_ctx, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('nothing to hash')
+    monkeypatch.setattr(user_import, 'ProcessPoolExecutor', no_pool)
+    _user('kim', 'student', major='Physics')
+    db.session.commit()
+    result, _ = _import('username,email,bio\nkim,kim@example.com,Hi\n', upsert=True)
+    assert result.updated == 1
+
+
+def test_hashing_pool_does_not_fork(app_ctx, monkeypatch):
+    methods = []
+
+    def recording_pool(*args, mp_context=None, **kwargs):
+        methods.append(mp_context.get_start_method() if mp_context else None)
+        return ProcessPoolExecutor(*args, mp_context=mp_context, **kwargs)
+    monkeypatch.setattr(user_import, 'ProcessPoolExecutor', recording_pool)
+    result, generated = _import('username,email\nana,ana@example.com\nben,ben@example.com\n')
+    assert result.created == 2 and len(generated) == 2
+    assert methods in (['forkserver'], ['spawn'])